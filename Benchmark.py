@@ -0,0 +1,388 @@
+from Board import Board
+from Elimination import read_rows
+from Engines import ENGINES, make_engines
+from Stats import CONFIDENCE, RunningStats, z_score
+from TileBoard import TileBoard
+from math import ceil, gcd, sqrt
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+
+# Board sizes to compare on: [rows, cols, mines]
+SIZES = [[9, 9, 10], [16, 16, 40], [16, 30, 99], [100, 100, 1600]]
+
+# Board sizes to time gauss() on, expert and larger
+GAUSS_SIZES = [[16, 30, 99], [50, 50, 500], [100, 100, 2000]]
+
+
+# Board sizes to compare the deduction engines on
+ENGINE_SIZES = [[16, 16, 40], [16, 30, 99], [50, 50, 500]]
+
+# Fixed seed corpus for the benchmark suite.
+# [name, rows, cols, mines, first seed, boards], board k of an entry uses seed first seed + k.
+CORPUS = [
+    ["beginner", 9, 9, 10, 1000, 200],
+    ["intermediate", 16, 16, 40, 2000, 100],
+    ["expert", 16, 30, 99, 3000, 100],
+    ["large_sparse", 200, 200, 4000, 4000, 5],
+    ["large_dense", 60, 60, 720, 5000, 10],
+]
+
+# Phases the suite times on every board
+PHASES = ["start", "flood", "monkey", "gauss", "driver"]
+
+# Boards of a corpus entry both runs must have timed before a slowdown is reported,
+# fewer say too little about the run-to-run spread. --quick times at least this many.
+MIN_COMPARE_BOARDS = 5
+
+
+# Board that reduces the whole frontier as one dense matrix, like gauss() used to:
+# a column for every covered border tile in every row, zeroes included.
+# Elimination is exact, as in Elimination.py, so both find the same tiles
+# and only the matrix differs. Only used as the baseline for compare_gauss().
+class WholeFrontierBoard(Board):
+
+    def frontier_components(self, seeds=None):
+        if seeds is not None and self.unsolved.isdisjoint(seeds):
+            return []
+        return [[self.border_indices_unsolved(), self.border_indices_covered()]]
+
+
+    def gauss_component(self, bcs_unsolved):
+        bcs_covered = self.border_indices_covered()
+        column = {j: k for k, j in enumerate(bcs_covered)}
+        g = list()
+        for bc in bcs_unsolved:
+            row = [0] * (len(bcs_covered) + 1)
+            row[-1] = self.mines_left(bc)
+            for j in self.nbd_covered(bc):
+                row[column[j]] = 1
+            g.append(row)
+        reduced = list()
+        for row in reduce_dense(g):
+            reduced.append([{bcs_covered[k]: v for k, v in enumerate(row[:-1]) if v != 0}, row[-1]])
+        return read_rows(reduced)
+
+
+# Reduces a dense integer matrix, a list of rows each ending in its value,
+# into reduced row echelon form by cross multiplying, in place.
+# Returns its nonzero rows.
+def reduce_dense(g):
+    if not g:
+        return g
+    r = 0
+    for lead in range(len(g[0]) - 1):
+        pivot = r
+        while pivot < len(g) and g[pivot][lead] == 0:
+            pivot += 1
+        if pivot == len(g):
+            continue
+        g[r], g[pivot] = g[pivot], g[r]
+        for i in range(len(g)):
+            if i != r and g[i][lead] != 0:
+                a = g[r][lead]
+                b = g[i][lead]
+                row = [a * x - b * y for x, y in zip(g[i], g[r])]
+                div = 0
+                for x in row:
+                    div = gcd(div, x)
+                if div > 1:
+                    row = [x // div for x in row]
+                g[i] = row
+        r += 1
+        if r == len(g):
+            break
+    return g[:r]
+
+
+# Builds and starts a board of the given class with a fixed seed,
+# so both board classes get the same mines and the same start tile.
+# TileBoard uses the global random generator, Board has its own,
+# and places its mines by rejection like TileBoard does.
+def make_board(board_class, rows, cols, mines, seed):
+    if board_class is TileBoard:
+        random.seed(seed)
+        b = board_class(rows, cols, mines)
+        rng = random
+    else:
+        b = board_class(rows, cols, mines, seed, placement="rejection")
+        rng = b.rng
+    row = rng.randint(0, rows-1)
+    col = rng.randint(0, cols-1)
+    b.start(row, col)
+    return b
+
+
+# Returns the peak memory, in bytes, used while building and starting a board.
+def board_memory(board_class, rows, cols, mines, seed=0):
+    tracemalloc.start()
+    b = make_board(board_class, rows, cols, mines, seed)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+# Returns the average seconds taken by start() and by driver()
+# over the given number of seeded trials.
+def board_speed(board_class, rows, cols, mines, trials):
+    start_time = 0
+    driver_time = 0
+    for seed in range(trials):
+        t = time.perf_counter()
+        b = make_board(board_class, rows, cols, mines, seed)
+        start_time += time.perf_counter() - t
+        t = time.perf_counter()
+        if board_class is TileBoard:
+            b.driver()
+        else:
+            b.driver(guessing=False)  # TileBoard never guesses
+        driver_time += time.perf_counter() - t
+    return [start_time / trials, driver_time / trials]
+
+
+# Prints memory and speed of the array backed Board
+# next to the old Tile() grid in TileBoard.
+def compare_representations(trials=20):
+    print("BOARD", "CLASS", "MEMORY(KB)", "START(ms)", "DRIVER(ms)", sep='\t')
+    for rows, cols, mines in SIZES:
+        for board_class in (TileBoard, Board):
+            memory = board_memory(board_class, rows, cols, mines)
+            start_time, driver_time = board_speed(board_class, rows, cols, mines, trials)
+            print(str(rows)+"x"+str(cols)+"/"+str(mines), board_class.__name__,
+                  round(memory / 1024, 1), round(1000 * start_time, 3),
+                  round(1000 * driver_time, 3), sep='\t')
+
+
+# Returns the average seconds spent in gauss() and the average number of
+# gauss() calls per board, solving the given number of seeded boards with driver()'s loop.
+def gauss_speed(board_class, rows, cols, mines, trials):
+    gauss_time = 0
+    gauss_calls = 0
+    for seed in range(trials):
+        b = make_board(board_class, rows, cols, mines, seed)
+        changes = 0
+        prev_changes = -1
+        while (changes != prev_changes):
+            prev_changes = changes
+            changes += b.monkey()
+            t = time.perf_counter()
+            changes += b.gauss()
+            gauss_time += time.perf_counter() - t
+            gauss_calls += 1
+    return [gauss_time / trials, gauss_calls / trials]
+
+
+# Prints time spent in gauss() per board when the frontier is split into components,
+# next to reducing the whole frontier as one matrix.
+def compare_gauss(trials=20):
+    print("BOARD", "FRONTIER", "GAUSS(ms)", "CALLS", sep='\t')
+    for rows, cols, mines in GAUSS_SIZES:
+        for board_class, name in ((WholeFrontierBoard, "whole"), (Board, "components")):
+            gauss_time, gauss_calls = gauss_speed(board_class, rows, cols, mines, trials)
+            print(str(rows)+"x"+str(cols)+"/"+str(mines), name,
+                  round(1000 * gauss_time, 3), round(gauss_calls, 1), sep='\t')
+
+
+# Returns the distinct frontier components of every position monkey() stalls on,
+# over the given number of seeded boards, each as a list of constraints (see Engines.py).
+# Boards are played on with the dpll engine, and guesses when it finds nothing,
+# so positions come from the whole of each game.
+def stalled_components(rows, cols, mines, trials):
+    components = dict()
+    engines = make_engines(["dpll"])
+    for seed in range(trials):
+        b = Board(rows, cols, mines, seed)
+        b.start(b.rng.randint(0, rows-1), b.rng.randint(0, cols-1))
+        while not b.exploded_count and b.covered_count():
+            b.monkey()
+            for bcs_unsolved, _ in b.frontier_components():
+                constraints = b.component_constraints(bcs_unsolved)
+                components[tuple(constraints)] = constraints
+            if not b.run_engines(engines) and not b.guess():
+                break
+    return list(components.values())
+
+
+# Prints, for each engine, how much it deduces and how long it takes
+# on the same stalled components of seeded boards.
+#   SOLVED is the number of components it found a mine or safe tile in,
+#   FORCED the number of mines and safe tiles found over all of them.
+def compare_engines(trials=20):
+    print("BOARD", "ENGINE", "COMPONENTS", "SOLVED", "FORCED", "TIME(ms)", sep='\t')
+    for rows, cols, mines in ENGINE_SIZES:
+        components = stalled_components(rows, cols, mines, trials)
+        for engine in make_engines(ENGINES):
+            solved = 0
+            forced = 0
+            t = time.perf_counter()
+            for constraints in components:
+                component_mines, component_safe, _ = engine.solve(constraints)
+                if component_mines or component_safe:
+                    solved += 1
+                    forced += len(component_mines) + len(component_safe)
+            engine_time = time.perf_counter() - t
+            print(str(rows)+"x"+str(cols)+"/"+str(mines), engine.name, len(components),
+                  solved, forced, round(1000 * engine_time, 3), sep='\t')
+
+
+# Times each phase on one board of the corpus. Returns {phase: seconds}.
+#   start is the whole of start(), flood is the open_tile() call inside it.
+#   monkey and gauss are the totals over driver()'s loop, without guessing.
+#   driver is a full driver() run, with guessing, on a fresh board from the same seed.
+# Boards are built from their seed, so every run times the same games.
+def time_board(rows, cols, mines, seed):
+    times = dict()
+    b = Board(rows, cols, mines, seed)
+    row = b.rng.randint(0, rows-1)
+    col = b.rng.randint(0, cols-1)
+    t = time.perf_counter()
+    b.place_mines(row, col)
+    flood_start = time.perf_counter()
+    b.open_tile(row, col)
+    times["flood"] = time.perf_counter() - flood_start
+    times["start"] = time.perf_counter() - t
+
+    times["monkey"] = 0
+    times["gauss"] = 0
+    changes = 0
+    prev_changes = -1
+    while (changes != prev_changes):
+        prev_changes = changes
+        t = time.perf_counter()
+        changes += b.monkey()
+        times["monkey"] += time.perf_counter() - t
+        t = time.perf_counter()
+        changes += b.gauss()
+        times["gauss"] += time.perf_counter() - t
+
+    b = Board(rows, cols, mines, seed)
+    b.start(b.rng.randint(0, rows-1), b.rng.randint(0, cols-1))
+    t = time.perf_counter()
+    b.driver()
+    times["driver"] = time.perf_counter() - t
+    return times
+
+
+# Nearest-rank percentile of a sorted list
+def percentile(values, p):
+    k = max(0, min(len(values) - 1, ceil(p / 100 * len(values)) - 1))
+    return values[k]
+
+
+# Times every phase on every board of the corpus.
+# Returns {name: {phase: {"boards", "boards_per_sec", "mean", "std", "p50", "p90", "p99"}}},
+# times in ms, std the standard deviation of a board's time.
+def run_suite(quick=False):
+    results = dict()
+    for name, rows, cols, mines, first_seed, boards in CORPUS:
+        if quick:
+            boards = min(boards, max(MIN_COMPARE_BOARDS, boards // 10))
+        samples = {phase: list() for phase in PHASES}
+        spread = {phase: RunningStats() for phase in PHASES}
+        for seed in range(first_seed, first_seed + boards):
+            times = time_board(rows, cols, mines, seed)
+            for phase in PHASES:
+                samples[phase].append(times[phase])
+                spread[phase].add(1000 * times[phase])
+        results[name] = dict()
+        for phase in PHASES:
+            values = sorted(samples[phase])
+            total = sum(values)
+            results[name][phase] = {
+                "boards": boards,
+                "boards_per_sec": boards / total if total else float("inf"),
+                "mean": 1000 * total / boards,
+                "std": sqrt(spread[phase].variance()),
+                "p50": 1000 * percentile(values, 50),
+                "p90": 1000 * percentile(values, 90),
+                "p99": 1000 * percentile(values, 99),
+            }
+    return results
+
+
+# Is the phase result r slower than base, a result of the same phase in another run?
+# Only when its median is more than tolerance slower, and its mean is slower by more
+# than the run-to-run spread explains: z standard errors of the difference of the means
+# at the given confidence. Returns None when either run timed fewer than
+# MIN_COMPARE_BOARDS boards (or is from before boards and std were saved).
+def slower(r, base, tolerance, confidence=CONFIDENCE):
+    if min(r.get("boards", 0), base.get("boards", 0)) < MIN_COMPARE_BOARDS:
+        return None
+    ratio = r["p50"] / base["p50"] if base["p50"] else 1.0
+    error = sqrt(r["std"] ** 2 / r["boards"] + base["std"] ** 2 / base["boards"])
+    return ratio > 1 + tolerance and r["mean"] - base["mean"] > z_score(confidence) * error
+
+
+# Prints the suite results, next to a baseline from an earlier run if one is given.
+# A phase is marked as a regression when slower() says so, and as FEW BOARDS
+# when there were too few boards to tell.
+# Returns the number of regressions.
+def report_suite(results, baseline=None, tolerance=0.25):
+    regressions = 0
+    header = ["CORPUS", "PHASE", "BOARDS/S", "MEAN(ms)", "STD(ms)", "P50(ms)", "P90(ms)", "P99(ms)"]
+    if baseline is not None:
+        header += ["BASE P50", "RATIO"]
+    print(*header, sep='\t')
+    for name in results:
+        for phase in PHASES:
+            r = results[name][phase]
+            line = [name, phase, round(r["boards_per_sec"], 1), round(r["mean"], 3), round(r["std"], 3),
+                    round(r["p50"], 3), round(r["p90"], 3), round(r["p99"], 3)]
+            if (baseline is not None) and (phase in baseline.get(name, dict())):
+                base = baseline[name][phase]
+                ratio = r["p50"] / base["p50"] if base["p50"] else 1.0
+                line += [round(base["p50"], 3), round(ratio, 2)]
+                verdict = slower(r, base, tolerance)
+                if verdict is None:
+                    line.append("FEW BOARDS")
+                elif verdict:
+                    line.append("REGRESSION")
+                    regressions += 1
+            print(*line, sep='\t')
+    return regressions
+
+
+# Usage: python Benchmark.py [representation|gauss|engines|suite] [options], see --help.
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks for the minesweeper solver.")
+    parser.add_argument("mode", nargs="?", default="representation",
+                        choices=["representation", "gauss", "engines", "suite"])
+    parser.add_argument("--trials", type=int, default=20,
+                        help="boards per size for representation, gauss and engines")
+    parser.add_argument("--quick", action="store_true",
+                        help="suite: time a tenth of the corpus, at least MIN_COMPARE_BOARDS boards of each entry")
+    parser.add_argument("--baseline", default=None,
+                        help="suite: JSON file from --save-baseline to compare against")
+    parser.add_argument("--save-baseline", default=None,
+                        help="suite: write this run's results to a JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="suite: slowdown of a median over the baseline that counts as a regression, "
+                             "if the means also differ by more than the run-to-run spread")
+    args = parser.parse_args(argv)
+
+    if args.mode == "gauss":
+        compare_gauss(args.trials)
+    elif args.mode == "engines":
+        compare_engines(args.trials)
+    elif args.mode == "suite":
+        baseline = None
+        if args.baseline is not None:
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        results = run_suite(args.quick)
+        regressions = report_suite(results, baseline, args.tolerance)
+        if args.save_baseline is not None:
+            with open(args.save_baseline, "w") as f:
+                json.dump(results, f, indent=1)
+        if regressions:
+            sys.exit(1)
+    else:
+        compare_representations(args.trials)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,31 +1,235 @@
-from Tile import *
-from random import randint
+from Elimination import solve_rows
+from Engines import make_engines
+from Patterns import canonical_window, solve_window
+from Probability import MAX_STEPS, enumerate_component, estimate_component, mine_probabilities
+from Profiler import Profiler
+from Renderer import Renderer
+from collections import deque
+from random import Random
 import time
 
 
+# Bits stored for each tile in Board.state
+MINED = 1
+FLAGGED = 2
+OPENED = 4
+
+# Table for bytes.translate() keeping only the MINED bit of each state byte
+MINED_BITS = bytes(b & MINED for b in range(256))
+# Text of a tile in Board.frame(), by whether it is drawn pretty
+FLAG_TEXT = {False: "F ", True: chr(128681) + " "}     # flag
+MINE_TEXT = {False: "X ", True: "X  "}
+ZERO_TEXT = {False: "- ", True: "   "}
+COVERED_TEXT = {False: "# ", True: chr(9608) + "  "}  # square
+NUMBER_GAP = {False: " ", True: "  "}
+
+# Table for bytes.translate() turning any non-zero byte into MINED
+GIVEN_BITS = bytes([0]) + bytes([MINED]) * 255
+
+
+# Draws exactly count distinct tiles, without replacement, out of size tiles,
+# never drawing the tiles in excluded (a sorted list of indices).
+# Positions are drawn among the allowed tiles only, and the excluded tiles
+# are put back in afterwards, so no draw is ever thrown away.
+# When more than half of the allowed tiles are mines, the safe tiles are drawn instead,
+# so at most half of the allowed tiles are ever drawn.
+# Returns a bytearray of size bytes, MINED on the drawn tiles and 0 elsewhere.
+def sample_mined(rng, size, count, excluded):
+    allowed_count = size - len(excluded)
+    if 2 * count <= allowed_count:
+        mined = bytearray(allowed_count)
+        drawn = rng.sample(range(allowed_count), count)
+        value = MINED
+    else:
+        mined = bytearray([MINED]) * allowed_count
+        drawn = rng.sample(range(allowed_count), allowed_count - count)
+        value = 0
+    for k in drawn:
+        mined[k] = value
+    for e in excluded:  # in increasing order, so each lands at its own index
+        mined.insert(e, 0)
+    return mined
+
+
+# Numbers a rows x cols grid in one pass, given one byte per tile, 1 if mined.
+# The grid is padded with a border of empty tiles and read as a single big integer,
+# so that moving to a neighbour is a shift by a fixed number of bytes.
+# The sum of the 8 shifted copies holds, in each byte, the number of mines
+# around that tile (at most 8, so bytes never carry over).
+# Mined tiles are then masked back to 0, like they always were.
+# Returns the numbers as rows*cols bytes.
+def count_around(mined, rows, cols):
+    width = cols + 2
+    size = (rows + 2) * width
+    padded = bytearray(size)
+    for r in range(rows):
+        start = (r + 1) * width + 1
+        padded[start:start + cols] = mined[r * cols:(r + 1) * cols]
+    grid = int.from_bytes(padded, "little")
+    around = 0
+    for shift in (1, width - 1, width, width + 1):
+        around += (grid >> (8 * shift)) + (grid << (8 * shift))
+    around &= ~(grid * 0xFF) & ((1 << (8 * size)) - 1)
+    counts = around.to_bytes(size, "little")
+    numbers = bytearray(rows * cols)
+    for r in range(rows):
+        start = (r + 1) * width + 1
+        numbers[r * cols:(r + 1) * cols] = counts[start:start + cols]
+    return numbers
+
+
+# Solves the system of one frontier component the way gauss() does.
+# bcs_unsolved are its unsolved tiles, in board order, and constraints their
+#   (tuple of covered tiles, mines left), in the same order.
+# Each unsolved tile gives the row: sum of its covered tiles = mines left around it.
+# Columns are the indices of the covered tiles.
+# A component small enough to fit in a pattern window is solved from its
+#   canonical key instead (see Patterns.py), looked up in patterns if given,
+#   so a pattern seen before on any board is not reduced again.
+# Kept apart from Board, so BatchBoard's stalled boards find exactly what gauss() would.
+# profiler and stop are those of the board being solved, or None,
+#   stop and progress are passed on to solve_rows().
+# Returns [mines, clear], two sets of covered tile indices.
+def solve_component(bcs_unsolved, constraints, cols, patterns=None, profiler=None, stop=None,
+                    progress=None):
+    codes = dict()
+    for bc, (cells, value) in zip(bcs_unsolved, constraints):
+        codes[bc] = str(value)
+        for j in cells:
+            codes[j] = "x"
+    window = canonical_window(codes, cols)
+    if window is not None:
+        key, position = window
+        if patterns is None:
+            mines, clear = solve_window(key)
+        else:
+            if profiler is not None:
+                if key in patterns:
+                    profiler.record("gauss.pattern_hits")
+                else:
+                    profiler.record("gauss.pattern_misses")
+            mines, clear = patterns.get(key)
+        tile = {p: i for i, p in position.items()}
+        return [{tile[p] for p in mines}, {tile[p] for p in clear}]
+
+    rows = list()
+    columns = set()
+    for cells, value in constraints:
+        rows.append([{j: 1 for j in cells}, value])
+        columns.update(cells)
+    if profiler is not None:  # matrix size of this component
+        profiler.record("gauss.rows", len(rows))
+        profiler.record("gauss.cols", len(columns))
+    return solve_rows(rows, stop, progress)
+
+
+# nbd size of each tile in a row of cols tiles, as bytes,
+# where row_size is how many rows the nbd spans (2 on the top or bottom edge, else 3).
+def nbd_sizes(row_size, cols):
+    return bytes(row_size * (1 + (c > 0) + (c < cols - 1)) - 1 for c in range(cols))
+
+
 class Board:
 
-    def __init__(self, rows, cols, num_mines):
+    def __init__(self, rows, cols, num_mines, seed=None, profile=False, placement="sample",
+                 patterns=None):
         self.cols = cols            # Number of columns in the game matrix
         self.rows = rows            # Number of rows in the game matrix
         self.num_mines = num_mines  # Number of mines in the game matrix
         self.is_solved = False      # Is the game finished yet?
 
-        self.mined = set()          # Set of Tile()s from matrix that contain mines
-        self.flagged = set()        # Set of Tile()s from matrix with flags on them
-        self.opened = set()         # Set of Tile()s from matrix which are opened
-
-        # 2-D array.
-        # The minesweeper map/matrix.
-        # TODO: Should name be m, M, or matrix
-        self.M = [[Tile() for c in range(cols)] for r in range(rows)]
-
-        # 2-D array which stores lists. 3-D?
-        # At each coordinate (r,c), a list of coordinates is stored.
-        # This list contains the coordinates of the 8 tiles around (r,c).
-        self.nbds = [[None for c in range(cols)] for r in range(rows)]
-
-        self.tracker = list()  # keep track of solve processes used, just for fun
+        # Each board has its own random generator, so a board can be
+        # played again from its seed, even in another process.
+        self.seed = seed
+        self.rng = Random(seed)
+        # "sample" draws exactly num_mines tiles without replacement,
+        # "rejection" is the original placement, see place_mines().
+        self.placement = placement
+        self.start_index = None     # Index of the tile the game started from, set by start()
+
+        # The per-tile arrays: numbers, state, nbds, covered_around and flags_around.
+        # See allocate(), HugeBoard replaces them with lazily filled ones.
+        self.allocate()
+
+        # Counts kept up to date by mine_tile/flag_tile/open_tile,
+        # these replace the old mined/flagged/opened sets of Tile()s.
+        self.mined_count = 0        # Number of tiles that contain mines
+        self.flagged_count = 0      # Number of tiles with flags on them
+        self.opened_count = 0       # Number of tiles which are opened
+        self.misflagged_count = 0   # Number of flags on tiles without mines
+        self.exploded_count = 0     # Number of opened tiles with mines
+
+        # Frontier index, kept up to date by open_index/flag_tile
+        # so the solvers never have to rescan the whole board.
+        # Along with covered_around and flags_around, see allocate().
+        self.unsolved = set()   # Indices of opened number tiles with covered tiles around them
+        self.frontier = set()   # Indices of covered, unflagged tiles next to opened number tiles
+        self.changed = set()    # Indices of unsolved tiles whose constraint changed since the last gauss()
+        # Worklist of monkey(): unsolved tiles whose constraint changed since monkey() last
+        # looked at them, in the order they changed. queued holds the same tiles,
+        # so a tile is never on the worklist twice.
+        self.dirty = deque()
+        self.queued = set()
+        self.pairs_changed = set()  # Unsolved tiles whose constraint changed since the last pairs()
+        # Per engine name, unsolved tiles whose constraint changed since that engine last ran,
+        # see run_engines().
+        self.engine_changed = dict()
+
+        # Enumerated frontier components from the last guess(), keyed by their constraints,
+        # so components a move did not touch are not enumerated again.
+        self.component_cache = dict()
+
+        # PatternCache of gauss() results for small components, see Patterns.py.
+        # Can be shared by every board played in a process. None to solve them every time.
+        self.patterns = patterns
+
+        # Result of driver(): [Won/Lost, exploration, flags/mines, exploration, over budget, time]
+        self.tracker = list()
+
+        # Per-phase counters and timers, see Profiler.py.
+        # None unless profile is set, so an unprofiled board records nothing.
+        self.profiler = None
+        if profile:
+            self.profiler = Profiler()
+
+        # Renderer progress is drawn on, see render(). None until progress is first shown.
+        self.renderer = None
+
+        # Budget of driver(), see out_of_budget(). None for no limit.
+        self.deadline = None        # time.perf_counter() at which solving stops
+        self.step_budget = None     # Number of budget checks after which solving stops
+        self.budget_steps = 0       # Number of budget checks so far
+        self.over_budget = False    # Did the budget stop the solve?
+        # [constraints, reduce_rows() progress] of the component gauss() stopped partway
+        # through reducing, so the next gauss() carries on instead of starting it again.
+        self.gauss_progress = None
+
+    # Makes the per-tile arrays, all stored flat.
+    # Tile (r,c) lives at index r*cols + c in each array.
+    # numbers holds the number shown on each tile,
+    # state holds the MINED/FLAGGED/OPENED bits of each tile.
+    # These replace the old 2-D grid of Tile()s, see TileBoard.py.
+    # nbds holds, at each index, a tuple of the indices of the 8 tiles around it.
+    # covered_around holds the number of covered, unflagged tiles around each tile,
+    # flags_around holds the number of flags around each tile.
+    def allocate(self):
+        size = self.rows * self.cols
+        self.numbers = bytearray(size)
+        self.state = bytearray(size)
+        self.nbds = [None] * size
+        self.covered_around = bytearray(size)
+        self.flags_around = bytearray(size)
+
+    ############################## COORDINATES ##############################
+
+    # Flat index of the tile at (row, col)
+    def index(self, row, col):
+        return row * self.cols + col
+
+
+    # [row, col] of the tile at flat index i
+    def coords(self, i):
+        return [i // self.cols, i % self.cols]
 
     ############################## PRINTS ##############################
 
@@ -34,54 +238,66 @@ class Board:
     # Prints the current state of the board on the right,
     #   with #s marking covered tiles, and Fs marking flags. 0s shown as -s.
     #   Bombs are not marked. This printing is what a game player would see.
+    # The whole board is built first and printed in one call, see frame().
 
     def print(self):
-        for r in range(self.rows):
-            for c in range(self.cols):
-                if self.M[r][c].is_mined:
-                    print("X", end=' ')
-                else:
-                    print(self.M[r][c].number, end=' ')
-            print("          ", end='')
-            for c in range(self.cols):
-                if self.M[r][c].is_flagged:
-                    print("F", end=' ')
-                elif self.M[r][c].is_opened:
-                    if self.M[r][c].is_mined:
-                        print("X", end=' ')
-                    elif self.M[r][c].number == 0:
-                        print("-", end=' ')
-                    else:
-                        print(self.M[r][c].number, end=' ')
-                else:
-                    print("#", end=' ')
-            print("\n")
+        print("".join("".join(row) + "\n\n" for row in self.frame(False)), end="")
 
 
     # Prints only current state of board using special characters
     # Flag emoijis denote flags, solid squares are covered tiles, and zeroes are empty
     def print_pretty(self):
+        print("".join("".join(row) + "\n\n" for row in self.frame(True)), end="")
+
+
+    # The text print() (or print_pretty(), with pretty) shows for the board,
+    # as a list of rows, each a list of the text of each tile with the spaces after it.
+    # print() rows also hold the gap between its two boards.
+    # Used by the prints and by the Renderer, see render().
+    def frame(self, pretty=False):
+        state = self.state
+        numbers = self.numbers
+        frame = list()
         for r in range(self.rows):
-            for c in range(self.cols):
-                if self.M[r][c].is_flagged:
-                    #print("F", end = ' ')
-                    print(chr(128681), end=' ')  # flag
-                elif self.M[r][c].is_opened:
-                    if self.M[r][c].is_mined:
-                        print("X", end='  ')
-                    elif self.M[r][c].number == 0:
-                        #print("-", end = ' ')
-                        print(" ", end='  ')
+            row = list()
+            if not pretty:
+                for i in range(r * self.cols, (r + 1) * self.cols):
+                    if state[i] & MINED:
+                        row.append("X ")
+                    else:
+                        row.append(str(numbers[i]) + " ")
+                row.append("          ")
+            for i in range(r * self.cols, (r + 1) * self.cols):
+                if state[i] & FLAGGED:
+                    row.append(FLAG_TEXT[pretty])
+                elif state[i] & OPENED:
+                    if state[i] & MINED:
+                        row.append(MINE_TEXT[pretty])
+                    elif numbers[i] == 0:
+                        row.append(ZERO_TEXT[pretty])
                     else:
-                        print(self.M[r][c].number, end='  ')
+                        row.append(str(numbers[i]) + NUMBER_GAP[pretty])
                 else:
-                    # print("#", end=' ')
-                    print(chr(9608), end='  ')  # square
-            print("\n")
+                    row.append(COVERED_TEXT[pretty])
+            frame.append(row)
+        return frame
+
+
+    # Draws the board on the Renderer shown progress is drawn on, made on first use.
+    # Until delay seconds have passed since the last frame the board is skipped,
+    # without building its frame, unless final is set.
+    # Returns the time it took, so the solver can leave it out of its timings.
+    def render(self, pretty=True, delay=1, clear=True, final=False):
+        if self.renderer is None:
+            self.renderer = Renderer(interval=delay, diff=clear)
+        if not (final or self.renderer.due()):
+            self.renderer.skipped += 1
+            return 0
+        return self.renderer.draw(self.frame(pretty), True)
 
     ############################## GAME SETUP ##############################
 
-    # Stores the neighborhood coordinates of
+    # Stores the neighborhood indices of
     # every tile for future lookup
     # Originally had a nbd(r,c) function which would
     # find and return the nbd of a tile. It was used frequently
@@ -96,89 +312,244 @@ class Board:
                             srow = r+rshift
                             scol = c+cshift
                             if (srow >= 0) and (scol >= 0) and (srow < self.rows) and (scol < self.cols):
-                                n.append([srow, scol])
-                self.nbds[r][c] = n
+                                n.append(srow * self.cols + scol)
+                self.nbds[r * self.cols + c] = tuple(n)
 
 
-    # Places the mines at random distinct positions,
-    # numbers all the tiles accordingly,
+    # Places the mines and numbers the tiles (see place_mines()),
     # then opens the tile at start row/col.
     # Starting tile is guaranteed to be a 0 tile.
-    def start(self, row, col):
+    # If mined is given, those mines are used instead of drawing them, see place_given().
+    def start(self, row, col, mined=None):
+        self.start_index = self.index(row, col)
+        if mined is None:
+            self.place_mines(row, col)
+        else:
+            self.place_given(mined)
+        self.open_tile(row, col)
+
+
+    # Places the mines at random distinct positions,
+    # away from the tile at start row/col and its nbd,
+    # and numbers all the tiles accordingly.
+    # How the positions are picked depends on self.placement.
+    def place_mines(self, row, col):
+        if self.profiler is not None:
+            start_time = time.perf_counter()
         self.fill_nbds()
-        start_nbd = self.nbds[row][col]
-        self.M[row][col].number = 0
+        start = self.index(row, col)
+        start_nbd = self.nbds[start]
+        if self.placement == "rejection":
+            self.reject_mines(start, start_nbd)
+        else:
+            self.sample_mines(start, start_nbd)
+        self.mined_count = self.num_mines
+        self.number_tiles()
+        self.count_covered()
+        if self.profiler is not None:
+            self.profiler.record("place_mines.time", time.perf_counter() - start_time)
+
+
+    # Places the mines of a board saved earlier, see Snapshot.py.
+    # mined holds one byte per tile, non-zero where there is a mine.
+    # Nothing is drawn from rng, so the board is the same whatever its seed.
+    def place_given(self, mined):
+        self.fill_nbds()
+        self.state[:] = bytes(mined).translate(GIVEN_BITS)
+        self.mined_count = self.state.count(MINED)
+        self.number_tiles()
+        self.count_covered()
+
+
+    # Original placement: random tiles are drawn until num_mines of them are allowed.
+    # Most draws are thrown away on dense boards. Kept so old seeds give the same boards,
+    # TileBoard places its mines the same way.
+    def reject_mines(self, start, start_nbd):
         placed_mines = 0
         while placed_mines < self.num_mines:
-            r = randint(0, self.rows - 1)
-            c = randint(0, self.cols - 1)
-            if (not self.M[r][c].is_mined) and ([r, c] not in start_nbd) and ([r, c] != [row, col]):
-                self.mine_tile(r, c)
+            r = self.rng.randint(0, self.rows - 1)
+            c = self.rng.randint(0, self.cols - 1)
+            i = r * self.cols + c
+            if (not self.state[i] & MINED) and (i not in start_nbd) and (i != start):
+                self.state[i] |= MINED
                 placed_mines += 1
-        for r in range(self.rows):
-            for c in range(self.cols):
-                nbd_bombs = 0
-                if self.M[r][c] not in self.mined:
-                    n = self.nbds[r][c]
-                    for coord in n:
-                        if self.M[coord[0]][coord[1]].is_mined:
-                            nbd_bombs += 1
-                self.M[r][c].number = nbd_bombs
-                self.M[r][c].xy = [r, c]
-        self.tracker.append("start")
-        self.open_tile(row, col)
+
+
+    # Draws exactly num_mines distinct tiles outside the start tile and its nbd,
+    # see sample_mined().
+    def sample_mines(self, start, start_nbd):
+        excluded = sorted(start_nbd + (start,))
+        self.state[:] = sample_mined(self.rng, self.rows * self.cols, self.num_mines, excluded)
+
+
+    # Numbers every tile from the MINED bits in one pass, see count_around().
+    def number_tiles(self):
+        self.numbers[:] = count_around(self.state.translate(MINED_BITS), self.rows, self.cols)
+
+
+    # Sets covered_around to the size of each tile's nbd,
+    # as every tile starts covered. A tile's nbd size only depends on
+    # whether it is on an edge, so whole rows are copied instead of counting each tile.
+    def count_covered(self):
+        rows = self.rows
+        cols = self.cols
+        row_patterns = dict()   # rows on an edge, rows in the middle
+        for r in range(rows):
+            row_size = 1 + (r > 0) + (r < rows - 1)
+            if row_size not in row_patterns:
+                row_patterns[row_size] = nbd_sizes(row_size, cols)
+            self.covered_around[r * cols:(r + 1) * cols] = row_patterns[row_size]
 
     ############################## TILE CHANGES ##############################
 
     # Opens a tile.
-    # Add tile to set of opened tiles.
+    # Updates the counts of opened tiles.
     # If tile is 0, opens its surroundings like in a regular game.
+    # (a mine counts as a 0, but opening one ends the game, so nothing else is opened)
     # This used to be heavily recursive, but would hit the limit for large maps.
     #   I removed calling open_tile() on already opened tiles, and
     #   I also chose to open zeroes and their nbds using a queue instead of recursion.
+    #   The queue is now a flood fill, see flood().
 
     def open_tile(self, row, col):
-        if not self.M[row][col].is_opened:
-            self.M[row][col].is_opened = True
-            tile = self.M[row][col]
-            self.opened.add(tile)
-
-            if tile.number == 0:
-                zeroes = self.nbd_unopened_unflagged(row, col)
-                while zeroes:
-                    z = zeroes.pop(0)
-                    self.opened.add(self.M[z[0]][z[1]])
-                    self.M[z[0]][z[1]].is_opened = True
-                    if self.M[z[0]][z[1]].number == 0:
-                        n = self.nbd_unopened_unflagged(z[0], z[1])
-                        for coords in n:
-                            if (coords not in zeroes):
-                                zeroes.append(coords)
+        i = self.index(row, col)
+        if self.profiler is not None:
+            start_time = time.perf_counter()
+            opened = self.opened_count
+        if not self.state[i] & OPENED:
+            if self.numbers[i] == 0 and not self.state[i] & (MINED | FLAGGED):
+                self.flood(i)
+            else:
+                self.open_index(i)
+        if self.profiler is not None:
+            self.profiler.record("open_tile.time", time.perf_counter() - start_time)
+            self.profiler.record("open_tile.opened", self.opened_count - opened)
+
+
+    # Opens the 0 tile at index i, and everything a chain of 0s connects it to.
+    # Tiles are opened as they are put on the queue, so the opened bit doubles as
+    #   the visited mark and no tile is queued twice. With a deque this is linear
+    #   in the size of the opened region (the old list pop(0)/"not in" was quadratic).
+    # The frontier index is brought up to date once at the end, instead of per tile:
+    #   an opened 0 never has covered tiles around it, so only the numbered tiles
+    #   at the edge of the region and the tiles around them are recounted.
+    def flood(self, i):
+        state = self.state
+        numbers = self.numbers
+        nbds = self.nbds
+        covered_around = self.covered_around
+        state[i] |= OPENED
+        opened = [i]    # every tile opened by this flood
+        numbered = []   # the opened tiles which are not 0s
+        edge = set()    # tiles whose covered_around has to be recounted
+        zeroes = deque([i])
+        while zeroes:
+            z = zeroes.popleft()
+            covered_around[z] = 0
+            for j in nbds[z]:
+                s = state[j]
+                if not s & (OPENED | FLAGGED):
+                    state[j] = s | OPENED
+                    opened.append(j)
+                    if numbers[j] == 0:
+                        zeroes.append(j)
+                    else:
+                        numbered.append(j)
+                elif (numbers[j] != 0) or (s & FLAGGED):  # opened before, or flagged
+                    edge.add(j)
+        self.opened_count += len(opened)
+        self.frontier.difference_update(opened)
+
+        for j in numbered:
+            edge.add(j)
+            edge.update(nbds[j])
+        for e in edge:
+            count = 0
+            for k in nbds[e]:
+                if not state[k] & (OPENED | FLAGGED):
+                    count += 1
+            covered_around[e] = count
+            if (state[e] & (OPENED | MINED)) == OPENED and numbers[e] != 0:
+                if count == 0:
+                    self.unsolved.discard(e)
+                else:
+                    if e not in self.unsolved:
+                        self.unsolved.add(e)
+                        self.frontier.update(self.nbd_covered(e))
+                    self.mark_changed(e)
+
+
+    # Sets the opened bit of a single tile and updates the counts and the frontier.
+    # Does not open the surroundings of zeroes, see open_tile().
+    def open_index(self, i):
+        if not self.state[i] & OPENED:
+            if not self.state[i] & FLAGGED:
+                self.frontier.discard(i)
+                for j in self.nbds[i]:
+                    self.covered_around[j] -= 1
+                    if self.covered_around[j] == 0:
+                        self.unsolved.discard(j)
+                    elif j in self.unsolved:
+                        self.mark_changed(j)
+            self.state[i] |= OPENED
+            self.opened_count += 1
+            if self.state[i] & MINED:
+                self.exploded_count += 1
+            elif self.numbers[i] != 0 and self.covered_around[i] != 0:
+                self.unsolved.add(i)
+                self.mark_changed(i)
+                self.frontier.update(self.nbd_covered(i))
+
+
+    # Marks the unsolved tile at index i as changed,
+    # for gauss() and pairs(), and on monkey()'s worklist.
+    def mark_changed(self, i):
+        self.changed.add(i)
+        self.pairs_changed.add(i)
+        if i not in self.queued:
+            self.queued.add(i)
+            self.dirty.append(i)
 
 
     # Mark tile as flagged.
-    # Add tile to set of flagged tiles.
+    # Updates the counts of flagged tiles and the frontier.
     def flag_tile(self, row, col):
-        self.M[row][col].is_flagged = True
-        self.flagged.add(self.M[row][col])
+        i = self.index(row, col)
+        if not self.state[i] & FLAGGED:
+            if not self.state[i] & OPENED:
+                self.frontier.discard(i)
+                for j in self.nbds[i]:
+                    self.covered_around[j] -= 1
+                    self.flags_around[j] += 1
+                    if self.covered_around[j] == 0:
+                        self.unsolved.discard(j)
+                    elif j in self.unsolved:
+                        self.mark_changed(j)
+            self.state[i] |= FLAGGED
+            self.flagged_count += 1
+            if not self.state[i] & MINED:
+                self.misflagged_count += 1
 
 
     # Set tile as mined.
-    # Add tile to set of mine tiles.
+    # Updates the counts of mined tiles.
     def mine_tile(self, row, col):
-        self.M[row][col].is_mined = True
-        self.mined.add(self.M[row][col])
+        i = self.index(row, col)
+        if not self.state[i] & MINED:
+            self.state[i] |= MINED
+            self.mined_count += 1
 
     ############################## CHECKS ##############################
 
     # Return true and set is_solved to true if board is solved.
+    # Uses only the counts, so it no longer scans the board.
 
     def board_check(self):
-        if self.flagged != self.mined:  # mines unflagged
+        if self.flagged_count != self.mined_count or self.misflagged_count:  # mines unflagged
             return False
-        elif self.opened.intersection(self.mined):  # opened mines
+        elif self.exploded_count:  # opened mines
             return False
-        elif len(self.opened) != ((self.rows * self.cols)-self.num_mines):  # unopened tiles
+        elif self.opened_count != ((self.rows * self.cols)-self.num_mines):  # unopened tiles
             return False
         self.is_solved = True
         return True
@@ -194,18 +565,24 @@ class Board:
 
     # returns true if a tile has all its flags
     def tile_flag_check(self, row, col):
-        if self.tile_flag_count(row, col) == self.M[row][col].number:
+        if self.tile_flag_count(row, col) == self.numbers[self.index(row, col)]:
             return True
         return False
 
 
     # returns number of flags in tile's radius
     def tile_flag_count(self, row, col):
-        flag_count = 0
-        for coords in self.nbds[row][col]:
-            if self.M[coords[0]][coords[1]].is_flagged:
-                flag_count += 1
-        return flag_count
+        return self.flag_count(self.index(row, col))
+
+
+    # returns number of flags around the tile at index i
+    def flag_count(self, i):
+        return self.flags_around[i]
+
+
+    # returns number of mines around the tile at index i which are not flagged yet
+    def mines_left(self, i):
+        return self.numbers[i] - self.flags_around[i]
 
     ############################## FETCH ##############################
 
@@ -213,11 +590,16 @@ class Board:
     # which are covered yet not flagged
 
     def nbd_unopened_unflagged(self, row, col):
+        return [self.coords(j) for j in self.nbd_covered(self.index(row, col))]
+
+
+    # Returns a list of the indices surrounding the tile at index i
+    # which are covered yet not flagged
+    def nbd_covered(self, i):
         result = list()
-        for coords in self.nbds[row][col]:
-            t = self.M[coords[0]][coords[1]]
-            if (not t.is_opened) and (not t.is_flagged):
-                result.append(t.xy)
+        for j in self.nbds[i]:
+            if not self.state[j] & (OPENED | FLAGGED):
+                result.append(j)
         return result
 
 
@@ -225,23 +607,25 @@ class Board:
     # (border coords in nbd of tile)
     def nbd_numbers(self, row, col):
         result = list()
-        if (not self.M[row][col].is_opened) and (not self.M[row][col].is_flagged):
-            for coords in self.nbds[row][col]:
-                tile = self.M[coords[0]][coords[1]]
-                if (tile.is_opened) and (tile.number != 0) and (tile.xy != [row, col]):
-                    result.append([coords[0], coords[1]])
+        i = self.index(row, col)
+        if not self.state[i] & (OPENED | FLAGGED):
+            for j in self.nbds[i]:
+                if (self.state[j] & OPENED) and (self.numbers[j] != 0):
+                    result.append(self.coords(j))
         return result
 
 
     # Returns list of "border tile" coordinates meaning:
     # numbered, nonzero, open tiles
     def border_coords(self):
+        return [self.coords(i) for i in self.border_indices()]
+
+
+    def border_indices(self):
         result = list()
-        for r in range(self.rows):
-            for c in range(self.cols):
-                tile = self.M[r][c]
-                if (tile.is_opened) and (tile.number != 0):
-                    result.append(tile.xy)
+        for i in range(self.rows * self.cols):
+            if (self.state[i] & OPENED) and (self.numbers[i] != 0):
+                result.append(i)
         return result
 
 
@@ -249,242 +633,556 @@ class Board:
     # numbered, nonzero, opened tiles
     # with unopened, unflagged tiles in their radius
     def border_coords_unsolved(self):
-        result = list()
-        for coords in self.border_coords():
-            if self.nbd_unopened_unflagged(coords[0], coords[1]):
-                result.append([coords[0], coords[1]])
-        return result
+        return [self.coords(i) for i in self.border_indices_unsolved()]
+
+
+    # Read from the frontier index in board order.
+    def border_indices_unsolved(self):
+        return sorted(self.unsolved)
 
 
     # Returns list of coordinates representing
     # the border made up of covered tiles
     def border_coords_covered(self):
+        return [self.coords(i) for i in self.border_indices_covered()]
+
+
+    # Built from the frontier index, in the order the unsolved tiles see them.
+    # (gauss() results depend on this column order, so it is kept as before)
+    def border_indices_covered(self):
         bcc = list()
-        for bc in self.border_coords_unsolved():
-            for nc in self.nbd_unopened_unflagged(bc[0], bc[1]):
-                if nc not in bcc:
+        seen = set()
+        for bc in self.border_indices_unsolved():
+            for nc in self.nbd_covered(bc):
+                if nc not in seen:
+                    seen.add(nc)
                     bcc.append(nc)
         return bcc
 
 
+    # Returns the unsolved tiles which share covered tiles with the unsolved tile at index i,
+    # in board order. Found from the frontier index: the unsolved tiles
+    # around each covered tile around i.
+    def sharing(self, i):
+        result = set()
+        for c in self.nbd_covered(i):
+            for j in self.nbds[c]:
+                if j in self.unsolved:
+                    result.add(j)
+        result.discard(i)
+        return sorted(result)
+
+
+    # Splits the frontier into independent components.
+    # Returns a list of [unsolved tiles, covered tiles] pairs, where
+    # two unsolved tiles are in the same component if they share a covered tile,
+    # so covered tiles of different components never share a constraint.
+    # Each list is in the same order border_indices_unsolved/covered would use.
+    # If seeds is given, only the components holding at least one of those tiles are
+    # returned (in the same order), and the rest of the frontier is never looked at.
+    def frontier_components(self, seeds=None):
+        components = list()
+        seen = set()
+        if seeds is None:
+            seeds = self.border_indices_unsolved()
+        else:
+            seeds = sorted(self.unsolved.intersection(seeds))
+        for u in seeds:
+            if u in seen:
+                continue
+            seen.add(u)
+            stack = [u]
+            unsolved = list()
+            while stack:
+                bc = stack.pop()
+                unsolved.append(bc)
+                for nc in self.nbd_covered(bc):
+                    for j in self.nbds[nc]:
+                        if (j in self.unsolved) and (j not in seen):
+                            seen.add(j)
+                            stack.append(j)
+            unsolved.sort()
+            covered = list()
+            covered_seen = set()
+            for bc in unsolved:
+                for nc in self.nbd_covered(bc):
+                    if nc not in covered_seen:
+                        covered_seen.add(nc)
+                        covered.append(nc)
+            components.append([unsolved, covered])
+        components.sort()   # by their first unsolved tile, as they would be found from the whole frontier
+        return components
+
+
     def all_covered(self):
+        return [self.coords(i) for i in self.all_covered_indices()]
+
+
+    def all_covered_indices(self):
         ac = list()
-        for r in range(self.rows):
-            for c in range(self.cols):
-                if (not self.M[r][c].is_opened) and (not self.M[r][c].is_flagged):
-                    ac.append([r, c])
+        for i in range(self.rows * self.cols):
+            if not self.state[i] & (OPENED | FLAGGED):
+                ac.append(i)
         return ac
 
+
+    # Number of tiles which are covered yet not flagged
+    def covered_count(self):
+        return self.rows * self.cols - self.opened_count - self.flagged_count
+
     ############################## SOLVING ##############################
 
+    # Is driver() running on a budget?
+    def budgeted(self):
+        return (self.deadline is not None) or (self.step_budget is not None)
+
+
+    # Checked by every stage before each piece of work: a worklist tile, a pair,
+    # a component, or a row of elimination. Each check counts as one step.
+    # Returns True, and sets over_budget, once the budget's time or steps have run out.
+    # A stage which is told so stops where it is and leaves what it did not get to
+    # for next time, so the board stays as far as it got and can be carried on from.
+    def out_of_budget(self):
+        if not self.over_budget:
+            self.budget_steps += 1
+            if (self.step_budget is not None) and (self.budget_steps > self.step_budget):
+                self.over_budget = True
+            elif (self.deadline is not None) and (time.perf_counter() > self.deadline):
+                self.over_budget = True
+        return self.over_budget
+
+
+    # Checked by the searches inside a stage, see Probability.STOP_STEPS.
+    # Like out_of_budget(), but only the time is looked at and no step is counted,
+    # so a step budget never stops a search partway and loses what it did.
+    def out_of_time(self):
+        if (not self.over_budget) and (self.deadline is not None) and (time.perf_counter() > self.deadline):
+            self.over_budget = True
+        return self.over_budget
+
+
     # Simplest form of solving.
     # Returns number of changes it made.
     # If the tile has all its flags, yet still has covered tiles around it,
     #   those covered tiles must all be safe. Open them.
     # If the number on a tile is equal to the number of covered tiles around it,
     #   those covered tiles must all be flags. Flag them.
-    # Repeat monkey() until a repetition finishes without making any changes,
-    #   meaning monkey() has done all it can.
     # This function originally used recursion, but would hit the recursion limit
-    #   for reasons I could not discover. It was simplified by using the change count.
+    #   for reasons I could not discover. It was then a loop over every border tile,
+    #   repeated until a whole pass made no changes.
+    # Now it works through a worklist instead (see mark_changed()): opening or flagging
+    #   a tile queues the numbered tiles around it, and only queued tiles are looked at,
+    #   so the work done follows the changes made, not the size of the border.
+    #   A tile's rules only depend on its own constraint, so when the worklist is empty
+    #   no rule can fire anywhere, the same place the old passes stopped.
 
     def monkey(self, print_progress=False, print_pretty=True, print_delay=1, print_clear=True):
+        if self.profiler is not None:
+            start_time = time.perf_counter()
+        iterations = 0
+        dequeued = 0
         changes = 0
-        prev_changes = -1
-        while (changes != prev_changes):
+        budgeted = self.budgeted()
+        while True:
 
-            prev_changes = changes
+            iterations += 1
 
             if (print_progress):
-                if (print_clear):
-                    print(chr(27) + "[2J")  # clear terminal
-                else:
-                    print(chr(27))  # escape character, push old print back
-                if (print_pretty):
-                    self.print_pretty()
-                else:
-                    self.print()
-                time.sleep(print_delay)
-
-            # if a border tile has all its flags...
-            for bcu in self.border_coords_unsolved():
-                if self.M[bcu[0]][bcu[1]].number - self.tile_flag_count(bcu[0], bcu[1]) == 0:
-                    for coords in self.nbd_unopened_unflagged(bcu[0], bcu[1]):
-                        self.open_tile(coords[0], coords[1])
+                # drawing is left out of monkey's time, by moving its start up
+                rendered = self.render(print_pretty, print_delay, print_clear)
+                if self.profiler is not None:
+                    start_time += rendered
+
+            while self.dirty:
+                if budgeted and self.out_of_budget():   # the rest stays on the worklist
+                    break
+                bcu = self.dirty.popleft()
+                self.queued.discard(bcu)
+                dequeued += 1
+                if bcu not in self.unsolved:    # solved since it was queued
+                    continue
+                # if a border tile has all its flags...
+                if self.mines_left(bcu) == 0:
+                    for j in self.nbd_covered(bcu):
+                        self.open_tile(*self.coords(j))
                         changes += 1
                 # if a border tile's number == covered tiles in its nbd
-                nbd = self.nbd_unopened_unflagged(bcu[0], bcu[1])
-                if len(nbd) == self.M[bcu[0]][bcu[1]].number - self.tile_flag_count(bcu[0], bcu[1]):
-                    for coords in nbd:
-                        self.flag_tile(coords[0], coords[1])
+                elif self.covered_around[bcu] == self.mines_left(bcu):
+                    for j in self.nbd_covered(bcu):
+                        self.flag_tile(*self.coords(j))
                         changes += 1
 
+            if self.over_budget:
+                break
+
             # if remaining covered tiles = remaining mines, open them all
-            ac = self.all_covered()
-            if (len(self.mined) == len(self.flagged)):
-                for coords in ac:
-                    self.tracker.append("all_covered")
-                    self.open_tile(coords[0], coords[1])
+            # The counts are checked first, so the board is only scanned when this fires.
+            # Whatever it changes is queued, so the worklist is gone through again.
+            # Only the mine count a player is told is used, never where the mines are.
+            covered = self.covered_count()
+            if covered and (self.num_mines == self.flagged_count):
+                for j in self.all_covered_indices():
+                    self.open_tile(*self.coords(j))
                     changes += 1
-            if len(ac) == (len(self.mined) - len(self.flagged)):
-                for coords in ac:
-                    self.tracker.append("all_covered")
-                    self.flag_tile(coords[0], coords[1])
+                if self.profiler is not None:
+                    self.profiler.record("monkey.all_covered")
+            elif covered and covered == (self.num_mines - self.flagged_count):
+                for j in self.all_covered_indices():
+                    self.flag_tile(*self.coords(j))
                     changes += 1
+                if self.profiler is not None:
+                    self.profiler.record("monkey.all_covered")
+            else:
+                break
+
+        if self.profiler is not None:
+            self.profiler.record("monkey.time", time.perf_counter() - start_time)
+            self.profiler.record("monkey.iterations", iterations)
+            self.profiler.record("monkey.dequeued", dequeued)
+            self.profiler.record("monkey.changes", changes)
+        return changes
 
-        self.tracker.append(str("monkey "+str(changes)))
+
+    # Compares pairs of unsolved tiles which share covered tiles, like the classic "1-2" pattern.
+    # Returns number of changes it made.
+    # For two tiles x and y, the mines left around x which are not around y can only
+    #   be on the covered tiles around x alone. If there are as many of those as
+    #   mines(x) - mines(y), they must all be mines, and all y's mines are on shared tiles,
+    #   so the covered tiles around y alone are safe.
+    #   When x's covered tiles are a subset of y's, this is the subset rule:
+    #   if they have the same mines left, y's other tiles are safe.
+    # Only tiles changed since the last pairs() are compared with their partners.
+    # Cheaper than gauss(), which only runs once this finds nothing.
+
+    def pairs(self):
+        if self.profiler is not None:
+            start_time = time.perf_counter()
+        checked = 0
+        changes = 0
+        tiles = sorted(self.unsolved.intersection(self.pairs_changed))
+        self.pairs_changed.clear()
+        compared = set(tiles)   # a pair of changed tiles is compared once, from its first tile
+        budgeted = self.budgeted()
+        for k, u in enumerate(tiles):
+            if budgeted and self.out_of_budget():
+                self.pairs_changed.update(tiles[k:])    # compared next time instead
+                break
+            compared.discard(u)
+            u_covered = None
+            for v in self.sharing(u):
+                if v in compared:
+                    continue
+                if u not in self.unsolved:  # solved by an earlier pair
+                    break
+                if v not in self.unsolved:
+                    continue
+                checked += 1
+                if u_covered is None:
+                    u_covered = set(self.nbd_covered(u))
+                v_covered = set(self.nbd_covered(v))
+                for x, y, x_covered, y_covered in ((u, v, u_covered, v_covered),
+                                                   (v, u, v_covered, u_covered)):
+                    x_only = x_covered - y_covered
+                    if self.mines_left(x) - self.mines_left(y) == len(x_only):
+                        y_only = y_covered - x_covered
+                        for j in sorted(x_only):
+                            self.flag_tile(*self.coords(j))
+                            changes += 1
+                        for j in sorted(y_only):
+                            self.open_tile(*self.coords(j))
+                            changes += 1
+                        if x_only or y_only:
+                            u_covered = None
+                        break
+
+        if self.profiler is not None:
+            self.profiler.record("pairs.time", time.perf_counter() - start_time)
+            self.profiler.record("pairs.checked", checked)
+            self.profiler.record("pairs.changes", changes)
         return changes
 
 
-    # Place flags based on solutions to a reduced matrix
+    # Place flags and open tiles based on solutions to reduced matrices
     # formed from border tiles and the covered tiles around them.
-    # like a contraint problem.
+    # like a contraint problem. See Elimination.py for the reduction.
+    # The frontier is split into independent components, each reduced on its own,
+    #   so the cost grows with the size of each component instead of the whole frontier.
+    #   Only components with tiles changed since the last gauss() are built and reduced,
+    #   reducing the others again would find nothing new.
+    #   On a budget, each component's tiles stop counting as changed once it is reduced,
+    #   so a gauss() stopped partway carries on from the component it stopped in.
+    # Both outcomes are acted on in the same pass: mines are flagged and
+    #   clear tiles are opened, instead of waiting for monkey() to open them.
     # Returns the number of changes it made.
     def gauss(self):
-        # for example: in a simple board        1   2   x
-        # where x represents a covered tile:    x   2   1
-        # The matrix row representing the bottom "2" should be: 
-        #  1x_1 + 1x_2 = 2 --> 1 1 2.
-        # The matrix row representing the left "1" should be 
-        #  1x_1 + 0x_2 = 1 --> 1 0 1.
-        #   as x_2 is not in this "1"'s radius, 
-        #   it doesn't contribute to the "1" tile's value.
-        # x values can be either a 1 or a 0 -- a mine or a safe tile.
-        g = []
-        bcs_covered = self.border_coords_covered()  # covered tiles on border
-        for bc in self.border_coords_unsolved():  # unfinished opened tiles on border
-            row = [0 for _ in range(len(bcs_covered)+1)]
-            row[-1] = self.M[bc[0]][bc[1]].number - \
-                self.tile_flag_count(bc[0], bc[1])   # tile value at end of row
-            bc_nbd = self.nbd_unopened_unflagged(bc[0], bc[1])
-            for i in range(len(bcs_covered)):
-                if bcs_covered[i] in bc_nbd:
-                    row[i] = 1
-            g.append(row)
-
-        # Reduce matrix into reduced row echelon form.
-        # This can be interpreted to determine where to put flags.
-        # For example, a row "0 1 0 0 1" tells us that x_2 would be a 1/mine,
-        #   as x_2=1 is the only solution to 0x_1 + 1x_2 + 0x_3 + 0x_4 = 1.
-        # Similarly, a row 1 0 -1 1 tells us that x_1 is a mine and x_3 is clear,
-        #   as x_1=1 x_3=0 is the only solution to 1x_1 + 0x_2 + -1x_3 = 1.
-        # And so on.
-        # Based on pseudocode from Wikipedia.
-        try:
-            lead_var = 0  # lead variable is first nonzero value in row when in RREF
-            g_rows = len(g)
-            g_cols = len(g[0])
-
-            for r in range(g_rows):
-                if g_cols <= lead_var:
-                    raise Exception  # stop
-                i = r
-                while g[i][lead_var] == 0:  # move forward until first nonzero entry in row
-                    i += 1
-                    if g_rows == i:
-                        i = r
-                        lead_var += 1
-                        if g_cols == lead_var:  # went through whole row
-                            raise Exception  # stop
-
-                # switch row with found i row
-                temp = g[r]
-                g[r] = g[i]
-                g[i] = temp
-
-                # if lead nonzero (so, if row is nonzero)
-                if g[r][lead_var] != 0:
-                    div = g[r][lead_var]  # divide row by lead value
-                    for j in range(len(g[r])):
-                        g[r][j] = g[r][j] / div
-
-                for i in range(g_rows):
-                    if i != r:
-                        sub = g[i][lead_var]  # subtract lead*g[r][j] from row
-                        for j in range(len(g[i])):
-                            g[i][j] = g[i][j] - (sub * g[r][j])
-
-                lead_var += 1
-        except Exception:  # if we hit a "stop" in the reduction algorithm
-            pass
-
+        if self.profiler is not None:
+            start_time = time.perf_counter()
         mines = list()
         clear = list()
-        for row in g:   # make a list of the nonzero elements of the list
-            coeffs = list()
-            coeff_indices = list()
-            value = row[-1]  # last value in row
-            for i in range(len(row[:-1])):
-                if abs(row[i]) > 0:
-                    coeffs.append(row[i])
-                    coeff_indices.append(i)
-
-            # comparing the sum of pos/neg coeffs to the value at end of row
-            # is easier than considering each coeff individually
-            # If either of pos/neg coeffs add up to value at end of row,
-            # those pos/neg coeffs must be mines (x=1) and the neg/pos coeffs must be clear (x=1).
-            sum_pos = 0  # sum positive coefficients
-            sum_neg = 0  # sum negative coefficients
-            for c in coeffs:    # find sums
-                if c > 0:
-                    sum_pos += c
-                if c < 0:
-                    sum_neg += c
-            if value == sum_pos:    # if positive coeffs add up to row value,
-                # look at spaces in row instead of coeffs, so we can "map" to bcs_covered
-                for r in range(len(row)-1):
-                    if row[r] > 0:  # pos coeffs represent bomb tiles
-                        mines.append(bcs_covered[r])
-                    if row[r] < 0:  # neg coeffs represent clear tiles
-                        clear.append(bcs_covered[r])
-            if value == sum_neg:    # vice versa
-                for r in range(len(row)-1):
-                    if row[r] < 0:
-                        mines.append(bcs_covered[r])
-                    if row[r] > 0:
-                        clear.append(bcs_covered[r])
-            '''newmines = list()   # make mines list all entries in mines that aren't in not_mines
-            for b in mines:     # maybe this step can be eliminated?
-                if b not in clear:
-                    newmines.append(b)
-            mines = newmines'''
+        budgeted = self.budgeted()
+        for bcs_unsolved, _ in self.frontier_components(self.changed):
+            if budgeted and self.out_of_budget():
+                break
+            component_mines, component_clear = self.gauss_component(bcs_unsolved)
+            if self.over_budget:    # stopped partway through reducing it
+                break
+            mines += sorted(component_mines)
+            clear += sorted(component_clear)
+            if budgeted:
+                self.changed.difference_update(bcs_unsolved)
+        if not self.over_budget:
+            self.changed.clear()
 
         for bc in mines:    # flag all the coords the process determined belong to mines
-            self.flag_tile(bc[0], bc[1])
+            self.flag_tile(*self.coords(bc))
+        for bc in clear:    # open all the coords the process determined are clear
+            self.open_tile(*self.coords(bc))
+
+        if self.profiler is not None:
+            self.profiler.record("gauss.time", time.perf_counter() - start_time)
+            self.profiler.record("gauss.changes", len(mines) + len(clear))
+        return len(mines) + len(clear)
+
+
+    # Builds and solves the system of one frontier component, see solve_component().
+    # On a budget, a reduction which runs out is kept in gauss_progress, and carried on
+    # from there when the same component comes up again.
+    # Returns [mines, clear], two sets of covered tile indices.
+    def gauss_component(self, bcs_unsolved):
+        constraints = self.component_constraints(bcs_unsolved)
+        if not self.budgeted():
+            return solve_component(bcs_unsolved, constraints, self.cols, self.patterns, self.profiler)
+        progress = list()
+        if (self.gauss_progress is not None) and (self.gauss_progress[0] == constraints):
+            progress = self.gauss_progress[1]
+        result = solve_component(bcs_unsolved, constraints, self.cols, self.patterns, self.profiler,
+                                 self.out_of_budget, progress)
+        self.gauss_progress = None
+        if self.over_budget:
+            self.gauss_progress = [constraints, progress]
+        return result
 
-        self.tracker.append(str("gauss " + str(len(mines))))
-        return len(mines)
 
+    # Constraints of a frontier component, one per unsolved tile in bcs_unsolved:
+    # (tuple of its covered tiles, mines left around it), as Engines.py and Probability.py take them.
+    def component_constraints(self, bcs_unsolved):
+        constraints = list()
+        for bc in bcs_unsolved:
+            constraints.append((tuple(self.nbd_covered(bc)), self.mines_left(bc)))
+        return constraints
 
-    # Runs monkey/gauss until they are no longer changing the board.
-    # Returns the time it took to run (including printing progress)
-    def driver(self, print_progress=False, print_pretty=True, print_delay=1, print_clear=True):
+
+    # Runs the engines (see Engines.py) in order, in place of pairs() and gauss(),
+    # stopping at the first one which changes the board.
+    # Each engine only looks at the components changed since it last ran,
+    # so a component one engine gives up on is still seen by the ones after it.
+    # Returns number of changes it made.
+    def run_engines(self, engines):
+        for engine in engines:
+            self.engine_changed.setdefault(engine.name, set()).update(self.changed)
+        self.changed.clear()
+        for engine in engines:
+            changes = self.deduce(engine)
+            if changes:
+                return changes
+        return 0
+
+
+    # Runs one engine on every component changed since it last ran,
+    # flags the mines and opens the safe tiles it finds.
+    # Returns number of changes it made.
+    def deduce(self, engine):
+        if self.profiler is not None:
+            start_time = time.perf_counter()
+        seeds = self.engine_changed.setdefault(engine.name, set())
+        mines = list()
+        clear = list()
+        budgeted = self.budgeted()
+        stop = None
+        if budgeted:
+            stop = self.out_of_time
+        for bcs_unsolved, _ in self.frontier_components(seeds):
+            if budgeted and self.out_of_budget():
+                break
+            component_mines, component_clear, _ = engine.solve(self.component_constraints(bcs_unsolved), stop)
+            mines += sorted(component_mines)    # proven even if the engine was stopped
+            clear += sorted(component_clear)
+            if self.over_budget:    # stopped partway, the component is solved again next time
+                break
+            if budgeted:
+                seeds.difference_update(bcs_unsolved)
+        if not self.over_budget:
+            seeds.clear()
+
+        for bc in mines:
+            self.flag_tile(*self.coords(bc))
+        for bc in clear:
+            self.open_tile(*self.coords(bc))
+
+        if self.profiler is not None:
+            self.profiler.record(engine.name + ".time", time.perf_counter() - start_time)
+            self.profiler.record(engine.name + ".changes", len(mines) + len(clear))
+        return len(mines) + len(clear)
+
+
+    # Opens the covered tile which is least likely to be a mine, see best_guess().
+    # Only used once monkey() and gauss() can not find anything certain.
+    # Returns the number of changes it made.
+    def guess(self, max_steps=MAX_STEPS):
+        if self.profiler is not None:
+            start_time = time.perf_counter()
+        guessed = self.best_guess(max_steps)
+        if guessed is None:
+            return 0
+        best, best_prob = guessed
+        self.open_tile(*self.coords(best))
+        if self.profiler is not None:
+            self.profiler.record("guess.time", time.perf_counter() - start_time)
+            self.profiler.record("guess.probability", best_prob)
+        return 1
+
+
+    # The covered tile which is least likely to be a mine, as [index, probability].
+    # Only reads what a player sees, so it works on any position, see Positions.py.
+    # Mine probabilities are exact: every valid placement of mines on each
+    #   frontier component is enumerated (see Probability.py), and weighted by
+    #   the ways to place the rest of the mines on the covered tiles off the frontier.
+    #   Components with more than max_steps assignments are estimated instead.
+    # Returns None if there is no covered tile, or the budget runs out first.
+    def best_guess(self, max_steps=MAX_STEPS):
+        cache = dict()
+        components = list()
+        budgeted = self.budgeted()
+        stop = None
+        if budgeted:
+            stop = self.out_of_time
+        for bcs_unsolved, _ in self.frontier_components():
+            constraints = self.component_constraints(bcs_unsolved)
+            key = tuple(constraints)
+            if key in self.component_cache:
+                component = self.component_cache[key]
+                if self.profiler is not None:
+                    self.profiler.record("guess.cached")
+            else:
+                # no time to weigh the odds, leave it there. The components enumerated
+                # so far are kept, so the next guess() only enumerates the rest.
+                if budgeted and self.out_of_budget():
+                    self.component_cache.update(cache)
+                    return None
+                component = enumerate_component(constraints, max_steps, stop)
+                if self.over_budget:
+                    self.component_cache.update(cache)
+                    return None
+                if component is None:
+                    component = estimate_component(constraints)
+                    if self.profiler is not None:
+                        self.profiler.record("guess.estimated")
+            cache[key] = component
+            components.append(component)
+        self.component_cache = cache  # drop components that no longer exist
+
+        other_count = self.covered_count() - len(self.frontier)
+        result = mine_probabilities(components, other_count, self.num_mines - self.flagged_count)
+        if result is None:  # estimates did not fit the mine count, fall back to flat odds
+            probs = {j: 0.5 for j in self.frontier}
+            other_prob = 1.0
+        else:
+            probs, other_prob = result
+
+        best = None
+        best_prob = 2.0
+        for j in sorted(probs):
+            if probs[j] < best_prob:
+                best = j
+                best_prob = probs[j]
+        if other_count and (best is None or other_prob < best_prob):
+            for j in self.all_covered_indices():
+                if j not in self.frontier:
+                    best = j
+                    best_prob = other_prob
+                    break
+        if best is None:
+            return None
+        return [best, best_prob]
+
+
+    # Runs monkey/pairs/gauss until they are no longer changing the board.
+    # Each monkey() call runs until its worklist is empty, then pairs() runs,
+    #   and gauss() only runs on what changed once pairs() finds nothing either.
+    #   With pairs off, gauss() runs straight after monkey() like before.
+    # If guessing, then guesses a tile whenever they stop, until the board
+    #   is finished or a mine is opened.
+    # With engines, a list of engine names (or engines) from Engines.py, those engines run
+    #   after monkey() in that order instead of pairs() and gauss(), see run_engines().
+    # With print_progress, the board is drawn before each monkey() pass and once at the end,
+    #   at most once every print_delay seconds, skipping the passes in between, see render().
+    # With time_budget (seconds) or step_budget (budget checks, see out_of_budget()),
+    #   solving stops once the budget runs out, leaving the board as far as it got.
+    #   The tracker then says so, and calling driver() again carries on from there.
+    # Returns the time it took to run (not counting drawing progress)
+    def driver(self, print_progress=False, print_pretty=True, print_delay=1, print_clear=True,
+               guessing=True, max_steps=MAX_STEPS, pairs=True, engines=None,
+               time_budget=None, step_budget=None):
         start_time = time.time()
-        changes = 0
-        prev_changes = -1
-        while (changes != prev_changes):
-            prev_changes = changes
-            changes += self.monkey(print_progress,
-                                   print_pretty, print_delay, print_clear)
-            # print("to_gauss")
-            # time.sleep(.25)
-            changes += self.gauss()
+        self.deadline = None
+        if time_budget is not None:
+            self.deadline = time.perf_counter() + time_budget
+        self.step_budget = step_budget
+        self.budget_steps = 0
+        self.over_budget = False
+        if engines is not None:
+            engines = make_engines(engines, max_steps)
+        rendered = 0
+        if self.renderer is not None:
+            rendered = self.renderer.time
+        iterations = 0
+        while not self.exploded_count and not self.over_budget:
+            iterations += 1
+            self.monkey(print_progress,
+                        print_pretty, print_delay, print_clear)
+            if engines is not None:
+                changes = self.run_engines(engines)
+            elif pairs and self.pairs():
+                # back to monkey(), gauss() is not needed this time around
+                if self.profiler is not None:
+                    self.profiler.record("pairs.gauss_saved")
+                continue
+            else:
+                # monkey() has emptied its worklist, so gauss() only has to look
+                # at the components changed since it last ran.
+                changes = self.gauss()
+            # If gauss() (or the engines) changed nothing, nothing is queued and nothing
+            # is changed, so monkey() and gauss() would find nothing more.
+            if guessing and not changes and self.covered_count() and not self.over_budget:
+                changes = self.guess(max_steps)
+            if not changes:
+                break
+
+        if print_progress:
+            self.render(print_pretty, print_delay, print_clear, True)   # the finished board
+        # time spent drawing progress is not part of the solve
+        if self.renderer is not None:
+            start_time += self.renderer.time - rendered
 
         exploration = 100 * \
-            (1-(len(self.all_covered()) / (self.rows * self.cols)))
+            (1-(self.covered_count() / (self.rows * self.cols)))
         endappend = list()
-        if exploration == 100:
+        if exploration == 100 and not self.exploded_count:
             endappend.append("Won")
         else:
             endappend.append("Lost")
 
         endappend.append(exploration)
-        endappend.append(str(len(self.flagged)) + "/" + str(len(self.mined)))
+        endappend.append(str(self.flagged_count) + "/" + str(self.mined_count))
         endappend.append(exploration)
+        endappend.append(self.over_budget)
         endappend.append(time.time()-start_time)
-        self.tracker.append(endappend)
+        self.tracker = [endappend]
+        if self.profiler is not None:
+            self.profiler.record("driver.time", endappend[-1])
+            self.profiler.record("driver.iterations", iterations)
+            if self.over_budget:
+                self.profiler.record("driver.over_budget")
         return self.tracker
 
-        # TODO: brute force border combinations?
         # TODO: generate all possible boards for brute force?
-        # TODO: guessing?
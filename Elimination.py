@@ -0,0 +1,152 @@
+from math import gcd
+
+
+# Exact, sparse Gauss-Jordan elimination used by Board.gauss().
+#
+# Each row of a system is a pair [coeffs, value], where coeffs is a dict
+# mapping a column (a covered tile) to its integer coefficient.
+# For example: in a simple board        1   2   x
+# where x represents a covered tile:    x   2   1
+# The row representing the bottom "2" is
+#  1x_1 + 1x_2 = 2 --> [{1: 1, 2: 1}, 2].
+# The row representing the left "1" is
+#  1x_1 + 0x_2 = 1 --> [{1: 1}, 1],
+#   as x_2 is not in this "1"'s radius, it is left out of the dict.
+# x values can be either a 1 or a 0 -- a mine or a safe tile.
+#
+# Rows only ever hold integers. Instead of dividing a row by its lead value,
+# rows are combined by cross multiplying and then divided by the gcd of
+# their entries, so no precision is lost and no float comparisons are made.
+# Only nonzero coefficients are stored, so rows stay about as small as
+# the nbd of a tile.
+
+
+# Raised when rows reduce to 0 = value with value nonzero: no x values of 0 or 1,
+# or of anything else, solve the system.
+class NoSolution(ValueError):
+    pass
+
+
+# Returns a*row - b*pivot_row, where a and b are chosen to cancel col,
+# divided through by the gcd of its entries.
+def combine(row, pivot_row, col):
+    coeffs, value = row
+    p_coeffs, p_value = pivot_row
+    a = p_coeffs[col]
+    b = coeffs[col]
+    new_coeffs = dict()
+    for c, v in coeffs.items():
+        new_coeffs[c] = a * v
+    for c, v in p_coeffs.items():
+        n = new_coeffs.get(c, 0) - b * v
+        if n == 0:
+            new_coeffs.pop(c, None)
+        else:
+            new_coeffs[c] = n
+    new_value = a * value - b * p_value
+    return normalize([new_coeffs, new_value])
+
+
+# Divides a row by the gcd of its entries,
+# and makes its lead (smallest column) coefficient positive.
+def normalize(row):
+    coeffs, value = row
+    if not coeffs:
+        return row
+    div = abs(value)
+    for v in coeffs.values():
+        div = gcd(div, v)
+    if coeffs[min(coeffs)] < 0:
+        div = -div
+    if div != 1:
+        coeffs = {c: v // div for c, v in coeffs.items()}
+        value = value // div
+    return [coeffs, value]
+
+
+# Reduces rows into reduced row echelon form.
+# Returns the list of nonzero reduced rows. The input rows are not changed.
+# Every column appears as a lead column of at most one returned row,
+# and lead columns appear in no other returned row.
+# If stop is given, it is called before each row is added, and once it returns True
+#   the reduction gives up and returns None.
+# If progress is given, a list, the reduction keeps its state there: [reduced rows so far,
+#   their lead columns, number of rows added]. Given back with the same rows after
+#   giving up, the reduction carries on from the row it stopped at.
+# Raises NoSolution if the rows contradict each other.
+def reduce_rows(rows, stop=None, progress=None):
+    if progress is None:
+        progress = list()
+    if not progress:
+        progress.extend([list(), dict(), 0])
+    reduced = progress[0]   # reduced rows so far
+    leads = progress[1]     # lead column -> position of its row in reduced
+    for n in range(progress[2], len(rows)):
+        if (stop is not None) and stop():
+            progress[2] = n
+            return None
+        row = [dict(rows[n][0]), rows[n][1]]
+        for col in [c for c in row[0] if c in leads]:
+            if col in row[0]:
+                row = combine(row, reduced[leads[col]], col)
+        if not row[0]:  # row was a combination of earlier rows
+            if row[1] != 0:
+                raise NoSolution("rows reduce to 0 = " + str(row[1]))
+            continue
+        row = normalize(row)
+        lead = min(row[0])
+        # clear the new lead column out of the earlier rows
+        for k in range(len(reduced)):
+            if lead in reduced[k][0]:
+                reduced[k] = combine(reduced[k], row, lead)
+        leads[lead] = len(reduced)
+        reduced.append(row)
+    progress[2] = len(rows)
+    return reduced
+
+
+# Reduces rows, then reads off the columns which must be mines
+# and the columns which must be safe.
+# For example, a reduced row x_2 = 1 tells us that x_2 is a mine.
+# Similarly, a row x_1 - x_3 = 1 tells us that x_1 is a mine and x_3 is clear,
+#   as x_1=1 x_3=0 is the only solution with x values of 0 or 1.
+# Comparing the sum of pos/neg coeffs to the value at end of row
+#   is easier than considering each coeff individually.
+#   If either of pos/neg coeffs add up to the value,
+#   those pos/neg coeffs must be mines (x=1) and the neg/pos coeffs must be clear (x=0).
+# Returns [mines, safe], two sets of columns.
+# stop and progress are passed on to reduce_rows(), if it gives up nothing is found.
+def solve_rows(rows, stop=None, progress=None):
+    reduced = reduce_rows(rows, stop, progress)
+    if reduced is None:
+        return [set(), set()]
+    return read_rows(reduced)
+
+
+# Reads off the columns which must be mines and must be safe from rows
+# already in reduced row echelon form, see solve_rows().
+# Returns [mines, safe], two sets of columns.
+def read_rows(reduced):
+    mines = set()
+    safe = set()
+    for coeffs, value in reduced:
+        sum_pos = 0  # sum positive coefficients
+        sum_neg = 0  # sum negative coefficients
+        for v in coeffs.values():
+            if v > 0:
+                sum_pos += v
+            else:
+                sum_neg += v
+        if value == sum_pos:    # positive coeffs are mines
+            for c, v in coeffs.items():
+                if v > 0:
+                    mines.add(c)
+                else:
+                    safe.add(c)
+        elif value == sum_neg:  # negative coeffs are mines
+            for c, v in coeffs.items():
+                if v < 0:
+                    mines.add(c)
+                else:
+                    safe.add(c)
+    return [mines, safe]
@@ -0,0 +1,313 @@
+from Elimination import NoSolution, solve_rows
+from Probability import MAX_STEPS, STOP_STEPS, enumerate_component
+
+
+# Deduction engines, which Board.driver() can run in place of pairs() and gauss().
+#
+# An engine is given one frontier component as a list of constraints [cells, value],
+# one per unsolved border tile: the tuple of covered tiles around it and
+# how many of them are mines, like Probability.py takes them.
+# solve(constraints, stop=None) returns [mines, safe, probabilities]:
+#   mines and safe are the sets of cells which must be mines and must be safe,
+#   probabilities maps each cell to its chance of being a mine, counting every
+#   valid placement of the component as equally likely, or is None if the engine
+#   does not work them out.
+# stop, if given, is a callback the longer engines call as they go. Once it returns True
+#   they give up, and only return the cells proven before that.
+# An engine which finds that no placement meets the constraints raises Elimination.NoSolution,
+#   rather than return cells read from a system with no solution. Components of a Board
+#   always have one, the board's own mines, so only positions from outside can raise it
+#   (see Positions.py).
+# An engine only reads its constraints, so engines can be run and compared
+# on the same components, on a board or off it (see Benchmark.py engines).
+#
+# The built-in engines, by name:
+#   rules      monkey()'s rules on each constraint alone
+#   pairs      pairs()'s rule on each two constraints sharing cells
+#   gauss      gauss()'s elimination, see Elimination.py
+#   dpll       backtracking search with unit propagation, see DPLLEngine
+#   enumerate  every valid placement, see Probability.enumerate_component()
+# dpll and enumerate find every forced cell of a component, unless they give up
+# on one too big to search, the others find the cells their rule reaches.
+
+
+# Cells of constraints, in order of first appearance
+def constraint_cells(constraints):
+    cells = dict()
+    for cs, value in constraints:
+        for c in cs:
+            cells[c] = None
+    return list(cells)
+
+
+# A constraint with no mines left has only safe cells,
+# one with as many mines left as cells has only mines.
+class RulesEngine:
+
+    name = "rules"
+
+    def solve(self, constraints, stop=None):
+        mines = set()
+        safe = set()
+        for cs, value in constraints:
+            if value == 0:
+                safe.update(cs)
+            elif value == len(cs):
+                mines.update(cs)
+        return [mines, safe, None]
+
+
+# For two constraints x and y sharing cells: if x needs as many more mines than y
+# as it has cells of its own, those are all mines and the cells of y alone are safe.
+class PairsEngine:
+
+    name = "pairs"
+
+    def solve(self, constraints, stop=None):
+        mines = set()
+        safe = set()
+        sets = [set(cs) for cs, value in constraints]
+        around = dict()     # cell -> constraints it is in
+        for k in range(len(constraints)):
+            for c in constraints[k][0]:
+                around.setdefault(c, list()).append(k)
+        for x in range(len(constraints)):
+            partners = set()
+            for c in constraints[x][0]:
+                partners.update(around[c])
+            partners.discard(x)
+            for y in partners:
+                x_only = sets[x] - sets[y]
+                if constraints[x][1] - constraints[y][1] == len(x_only):
+                    mines.update(x_only)
+                    safe.update(sets[y] - sets[x])
+        return [mines, safe, None]
+
+
+# Solves the component's system by elimination, like gauss() does.
+class EliminationEngine:
+
+    name = "gauss"
+
+    def solve(self, constraints, stop=None):
+        mines, safe = solve_rows([[{c: 1 for c in cs}, value] for cs, value in constraints], stop)
+        return [mines, safe, None]
+
+
+# Backtracking search, DPLL style: after each choice, every constraint which
+# has no mines left, or only mines left, sets its other cells (unit propagation),
+# and a constraint needing more mines than it has cells, or fewer than none,
+# undoes the last choice.
+# A cell is forced when no valid placement gives it the other value. One placement
+# is found first, then each cell is tried with the other value; any placement found
+# that way also rules out every other cell it differs on, so most cells take one search.
+# This finds every forced cell, like enumerate does, without visiting every placement.
+# Gives up after max_steps choices over the whole component, or once stop returns True
+# (called every STOP_STEPS choices), and then only returns the cells proven before that.
+class DPLLEngine:
+
+    name = "dpll"
+
+    def __init__(self, max_steps=MAX_STEPS):
+        self.max_steps = max_steps
+        self.gave_up = False    # Did the last solve() give up?
+
+
+    def solve(self, constraints, stop=None):
+        search = Search(constraints, self.max_steps, stop)
+        solution = search.solve(None, None)
+        self.gave_up = search.gave_up
+        mines = set()
+        safe = set()
+        if solution is None:
+            if not search.gave_up:
+                raise NoSolution("no placement meets the constraints")
+            return [mines, safe, None]
+        open_cells = list(range(len(search.cells)))
+        maybe = set(open_cells)     # cells no other placement has been found for yet
+        for p in open_cells:
+            if p not in maybe:
+                continue
+            other = search.solve(p, 1 - solution[p])
+            if other is None:
+                if search.gave_up:
+                    self.gave_up = True
+                    break
+                if solution[p]:
+                    mines.add(search.cells[p])
+                else:
+                    safe.add(search.cells[p])
+            else:
+                for q in range(len(other)):
+                    if other[q] != solution[q]:
+                        maybe.discard(q)
+        return [mines, safe, None]
+
+
+# State of a DPLLEngine search over one component's constraints.
+class Search:
+
+    def __init__(self, constraints, max_steps, stop=None):
+        self.cells = constraint_cells(constraints)
+        position = {c: p for p, c in enumerate(self.cells)}
+        self.members = [[position[c] for c in cs] for cs, value in constraints]
+        self.values = [value for cs, value in constraints]
+        self.cell_constraints = [list() for _ in self.cells]
+        for k in range(len(self.members)):
+            for p in self.members[k]:
+                self.cell_constraints[p].append(k)
+        # cells in most constraints first, they settle the most when chosen
+        self.order = sorted(range(len(self.cells)), key=lambda p: -len(self.cell_constraints[p]))
+        self.max_steps = max_steps
+        self.stop = stop
+        self.steps = 0
+        self.gave_up = False
+
+
+    # Returns a valid placement, as a list of 0/1 per cell, with cell p set to value
+    # if p is given, or None if there is none or the search gave up (see gave_up).
+    def solve(self, p, value):
+        self.value = [-1] * len(self.cells)
+        self.need = list(self.values)   # mines each constraint still needs
+        self.left = [len(m) for m in self.members]  # unset cells each constraint still has
+        self.trail = list()             # cells set so far, in order
+        start = list(range(len(self.members)))  # every constraint, for ones already settled
+        if p is not None:
+            if not self.assign(p, value):
+                return None
+        if not self.propagate(start):
+            return None
+
+        decisions = list()  # [trail length before the choice, cell, value tried]
+        while True:
+            p = None
+            for q in self.order:
+                if self.value[q] == -1:
+                    p = q
+                    break
+            if p is None:
+                return list(self.value)
+
+            decisions.append([len(self.trail), p, 0])
+            ok = self.choose(p, 0)
+            while not ok:
+                if self.gave_up:
+                    return None
+                while decisions and decisions[-1][2] == 1:
+                    self.undo(decisions.pop()[0])
+                if not decisions:
+                    return None
+                decision = decisions[-1]
+                self.undo(decision[0])
+                decision[2] = 1
+                ok = self.choose(decision[1], 1)
+
+
+    # Sets cell p to value and propagates. Returns False on a contradiction or giving up.
+    def choose(self, p, value):
+        self.steps += 1
+        if self.steps > self.max_steps:
+            self.gave_up = True
+            return False
+        if (self.stop is not None) and (self.steps % STOP_STEPS == 0) and self.stop():
+            self.gave_up = True
+            return False
+        return self.assign(p, value) and self.propagate(self.cell_constraints[p])
+
+
+    # Sets cell p to value. Returns False if a constraint of p can no longer be met.
+    def assign(self, p, value):
+        self.value[p] = value
+        self.trail.append(p)
+        valid = True
+        for k in self.cell_constraints[p]:
+            self.left[k] -= 1
+            self.need[k] -= value
+            if self.need[k] < 0 or self.need[k] > self.left[k]:
+                valid = False
+        return valid
+
+
+    # Sets the cells of settled constraints, starting from the constraints in queue,
+    # until nothing more is settled. Returns False on a contradiction.
+    def propagate(self, queue):
+        queue = list(queue)
+        while queue:
+            k = queue.pop()
+            if self.left[k] == 0:
+                continue
+            if self.need[k] == 0:
+                value = 0
+            elif self.need[k] == self.left[k]:
+                value = 1
+            else:
+                continue
+            for p in self.members[k]:
+                if self.value[p] == -1:
+                    if not self.assign(p, value):
+                        return False
+                    queue.extend(self.cell_constraints[p])
+        return True
+
+
+    # Unsets every cell set after the first length cells of the trail
+    def undo(self, length):
+        while len(self.trail) > length:
+            p = self.trail.pop()
+            value = self.value[p]
+            self.value[p] = -1
+            for k in self.cell_constraints[p]:
+                self.left[k] += 1
+                self.need[k] += value
+
+
+# Enumerates every valid placement of the component, see Probability.enumerate_component().
+# A cell with a mine in every placement is a mine, in none is safe.
+# The only engine which also gives probabilities.
+class EnumerationEngine:
+
+    name = "enumerate"
+
+    def __init__(self, max_steps=MAX_STEPS):
+        self.max_steps = max_steps
+
+
+    def solve(self, constraints, stop=None):
+        component = enumerate_component(constraints, self.max_steps, stop)
+        if component is None:
+            return [set(), set(), None]
+        cells, counts, cell_counts = component
+        total = sum(counts.values())
+        if total == 0:
+            raise NoSolution("no placement meets the constraints")
+        mines = set()
+        safe = set()
+        probabilities = dict()
+        for p in range(len(cells)):
+            placed = sum(cell_counts[k][p] for k in counts)
+            if placed == total:
+                mines.add(cells[p])
+            elif placed == 0:
+                safe.add(cells[p])
+            probabilities[cells[p]] = placed / total
+        return [mines, safe, probabilities]
+
+
+# Engine classes by name
+ENGINES = {engine.name: engine for engine in
+           (RulesEngine, PairsEngine, EliminationEngine, DPLLEngine, EnumerationEngine)}
+
+# Makes the engines named in names, in that order.
+# Engines already made are passed through, so names can mix the two.
+def make_engines(names, max_steps=MAX_STEPS):
+    engines = list()
+    for name in names:
+        if not isinstance(name, str):
+            engines.append(name)
+        elif name not in ENGINES:
+            raise ValueError("unknown engine " + repr(name) + ", choose from " + ", ".join(ENGINES))
+        elif name in ("dpll", "enumerate"):
+            engines.append(ENGINES[name](max_steps))
+        else:
+            engines.append(ENGINES[name]())
+    return engines
@@ -0,0 +1,254 @@
+from Board import Board, MINED_BITS, count_around, nbd_sizes, sample_mined
+from Probability import MAX_STEPS
+from math import exp, lgamma
+from random import Random
+import time
+
+
+# Board for boards too big to hold in full, with tens of millions of tiles.
+#
+# Board keeps a tuple of neighbours and four bytes for every tile, all made up front.
+# HugeBoard works out neighbours when they are asked for (see Neighbours),
+# and keeps its per-tile arrays in fixed-size chunks of whole rows (see ChunkedBytes),
+# which are only made when a tile in them is first read or written.
+# Mines are placed a chunk at a time in the same way: place_mines() only decides
+# how many mines each chunk gets, and a chunk's mines are drawn when it is first made.
+# So memory and time grow with the part of the board the solver actually reaches,
+# not with the size of the board.
+#
+# Everything else is Board's own code. Guessing is off by default, as guess()
+# weighs every covered tile on the board and would reach all of it.
+
+# Tiles per chunk, rounded down to whole rows
+CHUNK_TILES = 1 << 16
+
+
+# Neighbour lookup computed on the fly, in place of Board's stored nbds.
+# nbds[i] is the same tuple, in the same order, Board.fill_nbds() would store,
+# tiles away from the edges just add a fixed table of offsets.
+class Neighbours:
+
+    def __init__(self, rows, cols):
+        self.rows = rows
+        self.cols = cols
+
+    def __len__(self):
+        return self.rows * self.cols
+
+    def __getitem__(self, i):
+        cols = self.cols
+        r, c = divmod(i, cols)
+        if 0 < r < self.rows - 1 and 0 < c < cols - 1:
+            return (i - cols - 1, i - cols, i - cols + 1, i - 1,
+                    i + 1, i + cols - 1, i + cols, i + cols + 1)
+        n = list()
+        for rshift in (-1, 0, 1):
+            for cshift in (-1, 0, 1):
+                if not (rshift == 0 and cshift == 0):
+                    srow = r+rshift
+                    scol = c+cshift
+                    if (srow >= 0) and (scol >= 0) and (srow < self.rows) and (scol < cols):
+                        n.append(srow * cols + scol)
+        return tuple(n)
+
+
+# Byte array of size bytes, stored in chunks of chunk_size bytes
+# which are only made when first needed.
+# A new chunk is all 0s, then handed to fill(k, chunk), if given, to set it up.
+# Reading a chunk which was never made reads 0 when there is no fill,
+# without making the chunk.
+class ChunkedBytes:
+
+    def __init__(self, size, chunk_size, fill=None):
+        self.size = size
+        self.chunk_size = chunk_size
+        self.fill = fill
+        self.chunks = [None] * (-(-size // chunk_size))
+
+    def __len__(self):
+        return self.size
+
+    # Returns chunk k, making it first if needed
+    def chunk(self, k):
+        chunk = self.chunks[k]
+        if chunk is None:
+            chunk = bytearray(self.chunk_size)
+            if self.fill is not None:
+                self.fill(k, chunk)
+            self.chunks[k] = chunk
+        return chunk
+
+    def __getitem__(self, i):
+        k, j = divmod(i, self.chunk_size)
+        chunk = self.chunks[k]
+        if chunk is None:
+            if self.fill is None:
+                return 0
+            chunk = self.chunk(k)
+        return chunk[j]
+
+    def __setitem__(self, i, value):
+        k, j = divmod(i, self.chunk_size)
+        chunk = self.chunks[k]
+        if chunk is None:
+            chunk = self.chunk(k)
+        chunk[j] = value
+
+    # Number of chunks made so far
+    def made(self):
+        return len(self.chunks) - self.chunks.count(None)
+
+
+# Number of marked items among draws items taken, without replacement,
+# from total items of which marked are marked (a hypergeometric draw).
+# Exact inverse transform: the chances are added up outwards from the most likely count,
+# each one from the last by their ratio, so it only takes about as many steps
+# as the spread of the count.
+def hypergeometric(rng, draws, marked, total):
+    low = max(0, draws - (total - marked))
+    high = min(draws, marked)
+    if low == high:
+        return low
+
+    def log_comb(n, k):
+        return lgamma(n + 1) - lgamma(k + 1) - lgamma(n - k + 1)
+
+    # chance of x+1 over chance of x
+    def ratio(x):
+        return (marked - x) * (draws - x) / ((x + 1) * (total - marked - draws + x + 1))
+
+    mode = min(high, max(low, (draws + 1) * (marked + 1) // (total + 2)))
+    p_mode = exp(log_comb(marked, mode) + log_comb(total - marked, draws - mode) - log_comb(total, draws))
+    u = rng.random() - p_mode
+    up, p_up = mode, p_mode
+    down, p_down = mode, p_mode
+    while u > 0 and (up < high or down > low):
+        if up < high:
+            p_up *= ratio(up)
+            up += 1
+            u -= p_up
+            if u <= 0:
+                return up
+        if down > low:
+            p_down /= ratio(down - 1)
+            down -= 1
+            u -= p_down
+            if u <= 0:
+                return down
+    return mode  # only reached when rounding leaves a sliver of u over
+
+
+class HugeBoard(Board):
+
+    def __init__(self, rows, cols, num_mines, seed=None, profile=False, placement="sample",
+                 patterns=None, chunk_tiles=CHUNK_TILES):
+        self.chunk_rows = max(1, chunk_tiles // cols)   # Rows in each chunk
+        self.chunk_size = self.chunk_rows * cols        # Tiles in each chunk
+        # Per chunk, set by place_mines(): how many mines it has, and the seed its mines are drawn from.
+        self.chunk_mines = None
+        self.chunk_seeds = None
+        self.start_zone = ()    # Sorted indices of the start tile and its nbd
+        self.row_patterns = dict()  # nbd sizes of a row, by how many rows its nbds span
+        super().__init__(rows, cols, num_mines, seed, profile, placement, patterns)
+
+
+    # Makes the per-tile arrays of Board as chunked, lazily filled ones.
+    # A state chunk gets its mines when made, numbers are counted a chunk at a time
+    # from the mines, covered_around starts at each tile's nbd size, flags_around at 0.
+    def allocate(self):
+        size = self.rows * self.cols
+        self.numbers = ChunkedBytes(size, self.chunk_size, self.fill_numbers)
+        self.state = ChunkedBytes(size, self.chunk_size, self.fill_state)
+        self.nbds = Neighbours(self.rows, self.cols)
+        self.covered_around = ChunkedBytes(size, self.chunk_size, self.fill_covered)
+        self.flags_around = ChunkedBytes(size, self.chunk_size)
+
+
+    # Number of chunks made so far, over all the per-tile arrays
+    def chunks_made(self):
+        return (self.numbers.made() + self.state.made() +
+                self.covered_around.made() + self.flags_around.made())
+
+    ############################## GAME SETUP ##############################
+
+    # Splits num_mines between the chunks, away from the tile at start row/col and its nbd.
+    # Each chunk gets as many mines as it would from drawing num_mines tiles out of
+    # the whole board, one hypergeometric draw per chunk, so the total is exact.
+    # Where in the chunk they go is drawn later, when the chunk is made,
+    # from a seed of its own, so it does not matter in which order chunks are made.
+    # Rejection placement would touch every chunk, so placement is always sampled.
+    def place_mines(self, row, col):
+        if self.profiler is not None:
+            start_time = time.perf_counter()
+        start = self.index(row, col)
+        self.start_zone = tuple(sorted(self.nbds[start] + (start,)))
+        size = self.rows * self.cols
+        allowed_left = size - len(self.start_zone)
+        mines_left = self.num_mines
+        self.chunk_mines = list()
+        self.chunk_seeds = list()
+        for k in range(len(self.state.chunks)):
+            first = k * self.chunk_size
+            last = min(size, first + self.chunk_size)
+            allowed = last - first - len(self.excluded(k))
+            mines = hypergeometric(self.rng, allowed, mines_left, allowed_left)
+            self.chunk_mines.append(mines)
+            self.chunk_seeds.append(self.rng.getrandbits(64))
+            mines_left -= mines
+            allowed_left -= allowed
+        self.mined_count = self.num_mines
+        if self.profiler is not None:
+            self.profiler.record("place_mines.time", time.perf_counter() - start_time)
+
+
+    # Indices of start zone tiles in chunk k, counted from the start of the chunk
+    def excluded(self, k):
+        first = k * self.chunk_size
+        return [e - first for e in self.start_zone if first <= e < first + self.chunk_size]
+
+
+    # Draws the mines of chunk k, see sample_mined().
+    # Chunks made before place_mines() stay empty.
+    def fill_state(self, k, chunk):
+        if self.chunk_mines is None:
+            return
+        tiles = min(self.chunk_size, self.rows * self.cols - k * self.chunk_size)
+        rng = Random(self.chunk_seeds[k])
+        chunk[:tiles] = sample_mined(rng, tiles, self.chunk_mines[k], self.excluded(k))
+
+
+    # Numbers the tiles of chunk k with count_around(),
+    # on its rows along with the row above and the row below it.
+    def fill_numbers(self, k, chunk):
+        cols = self.cols
+        first_row = k * self.chunk_rows
+        last_row = min(self.rows, first_row + self.chunk_rows)
+        low = max(0, first_row - 1)
+        high = min(self.rows, last_row + 1)
+        mined = bytearray()
+        for r in range(low, high):
+            c, j = divmod(r * cols, self.chunk_size)
+            mined += self.state.chunk(c)[j:j + cols]
+        counts = count_around(mined.translate(MINED_BITS), high - low, cols)
+        chunk[:(last_row - first_row) * cols] = counts[(first_row - low) * cols:(last_row - low) * cols]
+
+
+    # Sets covered_around of chunk k to the size of each tile's nbd, like Board.count_covered().
+    def fill_covered(self, k, chunk):
+        cols = self.cols
+        first_row = k * self.chunk_rows
+        for r in range(first_row, min(self.rows, first_row + self.chunk_rows)):
+            row_size = 1 + (r > 0) + (r < self.rows - 1)
+            if row_size not in self.row_patterns:
+                self.row_patterns[row_size] = nbd_sizes(row_size, cols)
+            j = (r - first_row) * cols
+            chunk[j:j + cols] = self.row_patterns[row_size]
+
+    ############################## SOLVING ##############################
+
+    # Board.driver(), with guessing off unless asked for.
+    def driver(self, print_progress=False, print_pretty=True, print_delay=1, print_clear=True,
+               guessing=False, max_steps=MAX_STEPS, pairs=True, engines=None,
+               time_budget=None, step_budget=None):
+        return super().driver(print_progress, print_pretty, print_delay, print_clear, guessing, max_steps,
+                              pairs, engines, time_budget, step_budget)
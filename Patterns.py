@@ -0,0 +1,151 @@
+from Elimination import solve_rows
+from Engines import DPLLEngine
+from collections import OrderedDict
+import json
+import os
+
+
+# Cache of gauss() results for small frontier components, used by Board.gauss_component().
+#
+# A component which fits in a small window is written down as a key: the window's
+# height and width, then one character per tile of the window, row by row:
+#   a digit for each unsolved tile, the mines left around it (its number minus its flags),
+#   x for each covered tile of the component,
+#   . for anything else.
+# That is everything gauss() reads from the board, so the key decides the result.
+# Of the 8 rotations and reflections of the window, the key is the smallest one,
+# so a pattern along any wall, or in any direction, has the same key.
+# For example the "1-2-1" row  x x x
+#                               1 2 1   is  "2x3:121xxx" in every orientation.
+#
+# Results are solved from the key itself, so the same key always gives the same
+# result whether it came from the cache or not. They are solved completely (see
+# solve_window()), as what elimination reads off single rows depends on the order
+# of the columns, and would differ between the orientations of one pattern.
+
+# Components whose window is taller or wider than this are not cached
+MAX_WINDOW = 8
+
+# Default number of patterns kept in a PatternCache
+MAX_PATTERNS = 100000
+
+
+# The 8 rotations and reflections, as [transpose, flip rows, flip cols]
+SYMMETRIES = [[t, fr, fc] for t in (False, True) for fr in (False, True) for fc in (False, True)]
+
+
+# Returns the canonical window of a component, or None if it does not fit in MAX_WINDOW.
+# codes maps the board index of each tile of the component to its character,
+# cols is the number of columns of the board.
+# Returns [key, position], where position maps each board index in codes
+# to its index in the key's window (row * width + col).
+def canonical_window(codes, cols, max_window=MAX_WINDOW):
+    top = min(codes) // cols
+    bottom = max(codes) // cols
+    left = min(i % cols for i in codes)
+    right = max(i % cols for i in codes)
+    height = bottom - top + 1
+    width = right - left + 1
+    if height > max_window or width > max_window:
+        return None
+
+    best = None
+    for transpose, flip_rows, flip_cols in SYMMETRIES:
+        h, w = height, width
+        if transpose:
+            h, w = width, height
+        tiles = ["."] * (h * w)
+        position = dict()
+        for i, code in codes.items():
+            r = i // cols - top
+            c = i % cols - left
+            if transpose:
+                r, c = c, r
+            if flip_rows:
+                r = h - 1 - r
+            if flip_cols:
+                c = w - 1 - c
+            position[i] = r * w + c
+            tiles[r * w + c] = code
+        key = str(h) + "x" + str(w) + ":" + "".join(tiles)
+        if best is None or key < best[0]:
+            best = [key, position]
+    return best
+
+
+# Builds the system of a key's window and finds every tile it forces,
+# with the dpll engine (see Engines.py), so the result is the same in every orientation
+# and holds every tile elimination would find in any of them.
+# Each digit gives the row: sum of the x tiles around it = the digit.
+# Should the search give up, the tiles elimination finds are added to those it proved.
+# Returns [mines, safe], sorted lists of indices in the key's window.
+def solve_window(key):
+    size, tiles = key.split(":")
+    h, w = [int(n) for n in size.split("x")]
+    rows = list()
+    for i in range(h * w):
+        if tiles[i].isdigit():
+            r, c = divmod(i, w)
+            coeffs = dict()
+            for sr in (r - 1, r, r + 1):
+                for sc in (c - 1, c, c + 1):
+                    if 0 <= sr < h and 0 <= sc < w and tiles[sr * w + sc] == "x":
+                        coeffs[sr * w + sc] = 1
+            rows.append([coeffs, int(tiles[i])])
+    engine = DPLLEngine()
+    mines, safe, _ = engine.solve([[tuple(coeffs), value] for coeffs, value in rows])
+    if engine.gave_up:
+        row_mines, row_safe = solve_rows(rows)
+        mines |= row_mines
+        safe |= row_safe
+    return [sorted(mines), sorted(safe)]
+
+
+# Least recently used cache of key -> [mines, safe], holding at most max_size patterns.
+# If path is given, patterns saved there by an earlier run are loaded,
+# and save() writes them back.
+class PatternCache:
+
+    def __init__(self, max_size=MAX_PATTERNS, path=None):
+        self.max_size = max_size
+        self.path = path
+        self.patterns = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if (path is not None) and os.path.exists(path):
+            with open(path) as f:
+                for key, result in json.load(f).items():
+                    self.put(key, result)
+
+
+    def __contains__(self, key):
+        return key in self.patterns
+
+
+    # Returns the result for key, solving and storing it first if it is not cached.
+    def get(self, key):
+        result = self.patterns.get(key)
+        if result is None:
+            self.misses += 1
+            result = solve_window(key)
+            self.put(key, result)
+        else:
+            self.hits += 1
+            self.patterns.move_to_end(key)
+        return result
+
+
+    # Stores a result, dropping the least recently used pattern if the cache is full.
+    def put(self, key, result):
+        self.patterns[key] = result
+        self.patterns.move_to_end(key)
+        if len(self.patterns) > self.max_size:
+            self.patterns.popitem(last=False)
+
+
+    # Writes the patterns to path (or the path given when made), most recently used last.
+    def save(self, path=None):
+        if path is None:
+            path = self.path
+        with open(path, "w") as f:
+            json.dump(self.patterns, f)
@@ -0,0 +1,269 @@
+from Board import Board, FLAGGED, OPENED
+from Elimination import NoSolution
+from Engines import ENGINES, Search, make_engines
+from Probability import MAX_STEPS
+import argparse
+import json
+import sys
+
+
+# Deductions on positions from outside: partial games the solver did not play itself,
+# where only what a player sees is known.
+#
+# A position is one line of JSON: {"id": ..., "mines": 99, "board": [row, row, ...]},
+# each row a string with a character per tile, as Board.print() shows a game:
+#   #       a covered tile
+#   F       a flag, taken to be on a mine
+#   0-8, -  an opened tile and its number (- is an opened 0)
+# "mines" is the total number of mines on the board, "id" is optional.
+#
+# For each position one line of JSON is written:
+#   {"id": ..., "mines": [[row, col], ...], "safe": [[row, col], ...]}
+# the covered tiles which must be mines and must be safe, or {"id": ..., "error": "..."}
+# for a position which can not be read or has no solution.
+#
+# Positions are read, solved and written one at a time, so memory only depends on
+# the size of a position, not on how many there are.
+
+# Engines run on each position unless others are given, see Engines.py
+POSITION_ENGINES = ["gauss", "dpll"]
+
+# Number under each character of a row which stands for an opened tile
+TILE_NUMBERS = {str(n): n for n in range(9)}
+TILE_NUMBERS["-"] = 0
+
+# Positions which were once read wrongly, and what must be found for each:
+# [mines, safe] as [row, col] pairs, or None for a position with no solution. See check().
+# These are the answers of engines which find every forced tile, like dpll,
+# the rules and pairs engines alone miss some.
+CHECKS = [
+    [{"mines": 1, "board": ["-##", "###", "###"]}, [[], [[0, 1], [1, 0], [1, 1]]]],
+    [{"mines": 1, "board": ["-#", "##"]}, None],
+    [{"mines": 1, "board": ["1-", "##"]}, None],
+    [{"mines": 1, "board": ["-F", "##"]}, None],
+    [{"mines": 1, "board": ["##1", "-##"]}, [[[1, 2]], [[0, 0], [0, 1], [1, 1]]]],
+    [{"mines": 2, "board": ["12", "##"]}, None],
+    [{"mines": 0, "board": ["1#"]}, None],
+]
+
+
+# Board of a position, holding only what a player can see.
+# Board is made with mines of its own and start() places them. A PositionBoard has no
+# mines at all: the MINED bit is never set and numbers are only known for opened tiles.
+# Nothing is opened after it is made, as that would need the number under the tile,
+# so forced() only reports what it finds.
+# On a Board an opened 0 opens its neighbours, so it is never left next to covered tiles.
+# In a position it can be, and is then an unsolved tile like any other number:
+# a constraint that its covered neighbours have no mines.
+# The frontier index, counts and every stage which only reads numbers, flags and
+# covered tiles work the same as on a Board, so the deductions are Board's own.
+# exploded_count, misflagged_count and mined_count mean nothing here.
+class PositionBoard(Board):
+
+    # rows is the position's board, a list of strings as above.
+    def __init__(self, rows, num_mines):
+        if not isinstance(rows, list) or not rows or not all(isinstance(row, str) for row in rows):
+            raise ValueError("board must be a list of strings")
+        if not rows[0] or any(len(row) != len(rows[0]) for row in rows):
+            raise ValueError("board rows must all be the same, non-zero, length")
+        if not isinstance(num_mines, int):
+            raise ValueError("mines must be a whole number")
+        super().__init__(len(rows), len(rows[0]), num_mines)
+        self.fill_nbds()
+        self.count_covered()
+        opened = list()
+        for r in range(self.rows):
+            for c in range(self.cols):
+                ch = rows[r][c]
+                i = self.index(r, c)
+                if ch == "F":
+                    self.flag_tile(r, c)
+                elif ch in TILE_NUMBERS:
+                    self.numbers[i] = TILE_NUMBERS[ch]
+                    opened.append(i)
+                elif ch != "#":
+                    raise ValueError("unknown tile " + repr(ch) + " at " + str([r, c]))
+        for i in opened:
+            self.open_index(i)
+        for i in opened:
+            if self.numbers[i] == 0 and self.covered_around[i] != 0:
+                self.unsolved.add(i)
+                self.mark_changed(i)
+                self.frontier.update(self.nbd_covered(i))
+
+
+    # Indices of the covered tiles next to an opened 0, which must all be safe
+    def zero_neighbours(self):
+        safe = set()
+        for i in range(self.rows * self.cols):
+            if self.state[i] & OPENED and not self.state[i] & FLAGGED and self.numbers[i] == 0:
+                safe.update(self.nbd_covered(i))
+        return safe
+
+
+    # Returns an error message if no mine placement can fit what is shown, else None.
+    # Checks each opened number on its own, with the covered tiles next to an opened 0
+    # taken as safe, and the mine count.
+    def inconsistency(self):
+        zero_safe = self.zero_neighbours()
+        for i in range(self.rows * self.cols):
+            if self.state[i] & OPENED and not self.state[i] & FLAGGED:
+                if self.numbers[i] == 0 and self.flags_around[i]:
+                    return "there is a flag next to the opened 0 at " + str(self.coords(i))
+                left = self.mines_left(i)
+                if left < 0 or left > self.covered_around[i]:
+                    return "the number at " + str(self.coords(i)) + " does not fit the tiles around it"
+                if left > sum(1 for j in self.nbd_covered(i) if j not in zero_safe):
+                    return "the number at " + str(self.coords(i)) + " needs a mine next to an opened 0"
+        left = self.num_mines - self.flagged_count
+        if left < 0 or left > self.covered_count():
+            return "the mine count does not fit the covered tiles"
+        return None
+
+
+    # Returns [mines, safe], the sorted indices of covered tiles which must be mines
+    # and must be safe. The covered tiles next to an opened 0 are safe. Every frontier
+    # component is given to each engine, and what any of them finds is kept.
+    # When the mines left are 0, or as many as the covered tiles,
+    # every covered tile is safe, or a mine.
+    # Returns None if the position has no solution: a component no placement meets
+    # (searched for first, whichever engines are given, and then nothing an engine read
+    # off it is kept), a tile found to be both, or more mines found, or fewer tiles left
+    # which could be one, than there are mines left.
+    def forced(self, engines):
+        mines = set()
+        safe = self.zero_neighbours()
+        for bcs_unsolved, _ in self.frontier_components():
+            constraints = self.component_constraints(bcs_unsolved)
+            search = Search(constraints, MAX_STEPS)
+            if search.solve(None, None) is None and not search.gave_up:
+                return None
+            try:
+                for engine in engines:
+                    component_mines, component_safe, _ = engine.solve(constraints)
+                    mines.update(component_mines)
+                    safe.update(component_safe)
+            except NoSolution:
+                return None
+        covered = self.covered_count()
+        left = self.num_mines - self.flagged_count
+        if covered and left == 0:
+            safe.update(self.all_covered_indices())
+        elif covered and left == covered:
+            mines.update(self.all_covered_indices())
+        if not mines.isdisjoint(safe) or len(mines) > left or covered - len(safe) < left:
+            return None
+        return [sorted(mines), sorted(safe)]
+
+
+# Rows of the position a player sees on board, in the notation above.
+# Only the opened tiles' numbers and the flags are read, never where the mines are.
+def position_rows(board):
+    rows = list()
+    for r in range(board.rows):
+        row = list()
+        for i in range(r * board.cols, (r + 1) * board.cols):
+            if board.state[i] & FLAGGED:
+                row.append("F")
+            elif not board.state[i] & OPENED:
+                row.append("#")
+            elif board.numbers[i] == 0:
+                row.append("-")
+            else:
+                row.append(str(board.numbers[i]))
+        rows.append("".join(row))
+    return rows
+
+
+# Reads the deductions of one position, given as a line of JSON. Returns the line to write.
+def solve_position(line, engines):
+    position_id = None
+    try:
+        position = json.loads(line)
+        position_id = position.get("id")
+        board = PositionBoard(position["board"], position["mines"])
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        return {"id": position_id, "error": "can not read position: " + str(e)}
+    error = board.inconsistency()
+    if error is None:
+        result = board.forced(engines)
+        if result is None:
+            error = "no mine placement fits the position"
+    if error is not None:
+        return {"id": position_id, "error": error}
+    mines, safe = result
+    return {
+        "id": position_id,
+        "mines": [board.coords(i) for i in mines],
+        "safe": [board.coords(i) for i in safe],
+    }
+
+
+# Solves every position of the lines in infile, writing a line to outfile for each
+# as soon as it is solved. Blank lines are skipped.
+# Returns the number of positions read.
+def solve_positions(infile, outfile, engines=POSITION_ENGINES):
+    engines = make_engines(engines)
+    count = 0
+    for line in infile:
+        if not line.strip():
+            continue
+        outfile.write(json.dumps(solve_position(line, engines)) + "\n")
+        count += 1
+    return count
+
+
+# Solves the positions of CHECKS with the given engines, printing each one that
+# does not give what it must. Returns the number of those.
+def check(engines=POSITION_ENGINES):
+    engines = make_engines(engines)
+    failed = 0
+    for position, expected in CHECKS:
+        result = solve_position(json.dumps(position), engines)
+        if expected is None:
+            ok = "error" in result
+        else:
+            ok = "error" not in result and [result["mines"], result["safe"]] == expected
+        if not ok:
+            print("CHECK FAILED:", json.dumps(position), "gave", json.dumps(result))
+            failed += 1
+    return failed
+
+
+# Usage: python Positions.py [positions file] [--output file] [--engines ...], see --help.
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Forced mines and safe tiles of partial minesweeper positions.")
+    parser.add_argument("positions", nargs="?", default="-",
+                        help="file of positions, one JSON line each, - for stdin")
+    parser.add_argument("--output", default="-", help="file to write one JSON line per position to, - for stdout")
+    parser.add_argument("--engines", default=",".join(POSITION_ENGINES),
+                        help="comma separated engines to run on each position, from: " + ", ".join(ENGINES))
+    parser.add_argument("--check", action="store_true",
+                        help="solve the positions of CHECKS instead, exiting with 1 if any goes wrong")
+    args = parser.parse_args(argv)
+    engines = args.engines.split(",")
+    unknown = [name for name in engines if name not in ENGINES]
+    if unknown:
+        parser.error("unknown engines: " + ", ".join(unknown))
+    if args.check:
+        failed = check(engines)
+        print(len(CHECKS) - failed, "of", len(CHECKS), "checks passed")
+        sys.exit(1 if failed else 0)
+
+    infile = sys.stdin
+    outfile = sys.stdout
+    if args.positions != "-":
+        infile = open(args.positions)
+    if args.output != "-":
+        outfile = open(args.output, "w")
+    try:
+        solve_positions(infile, outfile, engines)
+    finally:
+        if infile is not sys.stdin:
+            infile.close()
+        if outfile is not sys.stdout:
+            outfile.close()
+
+
+if __name__ == "__main__":
+    main()
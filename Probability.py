@@ -0,0 +1,169 @@
+from fractions import Fraction
+from math import comb
+
+
+# Exact mine probabilities for Board.guess().
+#
+# A frontier component is given as a list of constraints [cells, value],
+# one per unsolved border tile: the tuple of covered tiles around it,
+# and how many of them are mines.
+# Every valid placement of mines on the component's covered tiles is enumerated,
+# and placements are weighted by the number of ways to place the remaining mines
+# on the covered tiles which are not on the frontier.
+
+# Default cap on the number of assignments tried when enumerating one component.
+MAX_STEPS = 100000
+
+# Number of assignments between calls to a search's stop callback, see enumerate_component()
+STOP_STEPS = 1024
+
+
+# Enumerates the valid mine placements of one component with backtracking.
+# A branch is pruned as soon as a constraint needs more mines than it has
+# unassigned tiles left, or fewer than zero.
+# Returns [cells, counts, cell_counts], where
+#   counts[k] is the number of placements with k mines, and
+#   cell_counts[k][p] is how many of those have a mine on cells[p].
+# Returns None if more than max_steps assignments were tried.
+# If stop is given, it is called every STOP_STEPS assignments, and once it returns True
+#   the enumeration gives up and returns None as well.
+def enumerate_component(constraints, max_steps=MAX_STEPS, stop=None):
+    cells = list()
+    position = dict()
+    for cs, value in constraints:
+        for c in cs:
+            if c not in position:
+                position[c] = len(cells)
+                cells.append(c)
+    n = len(cells)
+    cell_constraints = [list() for _ in range(n)]
+    need = list()   # mines each constraint still needs
+    left = list()   # unassigned tiles each constraint still has
+    for k in range(len(constraints)):
+        cs, value = constraints[k]
+        need.append(value)
+        left.append(len(cs))
+        for c in cs:
+            cell_constraints[position[c]].append(k)
+
+    counts = dict()
+    cell_counts = dict()
+    choice = [-1] * n   # -1 not tried yet, 0 tried safe, 1 tried mine
+    mines = 0
+    steps = 0
+    i = 0
+    # Iterative instead of recursive, components can be longer than the recursion limit.
+    while i >= 0:
+        if i == n:  # every cell assigned, record the placement
+            if mines not in counts:
+                counts[mines] = 0
+                cell_counts[mines] = [0] * n
+            counts[mines] += 1
+            placed = cell_counts[mines]
+            for p in range(n):
+                placed[p] += choice[p]
+            i -= 1
+            continue
+
+        tried = choice[i]
+        if tried != -1:  # undo the last choice for this cell
+            for k in cell_constraints[i]:
+                left[k] += 1
+                need[k] += tried
+            mines -= tried
+        if tried == 1:  # both choices tried, go back
+            choice[i] = -1
+            i -= 1
+            continue
+
+        steps += 1
+        if steps > max_steps:
+            return None
+        if (stop is not None) and (steps % STOP_STEPS == 0) and stop():
+            return None
+        tried += 1
+        choice[i] = tried
+        mines += tried
+        valid = True
+        for k in cell_constraints[i]:
+            left[k] -= 1
+            need[k] -= tried
+            if need[k] < 0 or need[k] > left[k]:
+                valid = False
+        if valid:
+            i += 1
+    return [cells, counts, cell_counts]
+
+
+# Cheap fallback for components too big to enumerate.
+# Each cell gets the highest mines-left/covered ratio of the constraints around it,
+# and the component is treated as having one placement with the rounded expected mines.
+# Returns the same [cells, counts, cell_counts] as enumerate_component().
+def estimate_component(constraints):
+    estimate = dict()
+    for cs, value in constraints:
+        ratio = Fraction(value, len(cs))
+        for c in cs:
+            if ratio > estimate.get(c, -1):
+                estimate[c] = ratio
+    cells = list(estimate)
+    k = round(sum(estimate.values()))
+    return [cells, {k: 1}, {k: [estimate[c] for c in cells]}]
+
+
+# Returns the convolution of two {mines: count} distributions.
+def convolve(a, b):
+    result = dict()
+    for ka, va in a.items():
+        for kb, vb in b.items():
+            result[ka + kb] = result.get(ka + kb, 0) + va * vb
+    return result
+
+
+# Combines enumerated components into mine probabilities.
+# components is a list of [cells, counts, cell_counts],
+# other_count is the number of covered, unflagged tiles off the frontier,
+# mines_left is the number of mines not flagged yet.
+# Returns [probs, other_prob], where probs maps each frontier tile to its mine probability,
+# and other_prob is the mine probability of each tile off the frontier.
+# Returns None if no placement fits the mine count.
+def mine_probabilities(components, other_count, mines_left):
+    # weight of a placement with t mines on the frontier
+    def weight(t):
+        if 0 <= mines_left - t <= other_count:
+            return comb(other_count, mines_left - t)
+        return 0
+
+    total_dist = {0: 1}
+    for cells, counts, cell_counts in components:
+        total_dist = convolve(total_dist, counts)
+    total = 0
+    other_mines = 0
+    for t, v in total_dist.items():
+        total += v * weight(t)
+        other_mines += v * weight(t) * (mines_left - t)
+    if total == 0:
+        return None
+
+    probs = dict()
+    for i in range(len(components)):
+        cells, counts, cell_counts = components[i]
+        rest = {0: 1}   # distribution of every component but this one
+        for j in range(len(components)):
+            if j != i:
+                rest = convolve(rest, components[j][1])
+        mine_weight = [0] * len(cells)
+        for k, placed in cell_counts.items():
+            w = 0
+            for t, v in rest.items():
+                w += v * weight(k + t)
+            if w:
+                for p in range(len(cells)):
+                    mine_weight[p] += placed[p] * w
+        for p in range(len(cells)):
+            probs[cells[p]] = float(Fraction(mine_weight[p]) / total)
+
+    other_prob = 0.0
+    if other_count:
+        other_prob = float(Fraction(other_mines) / (total * other_count))
+    return [probs, other_prob]
@@ -0,0 +1,59 @@
+import sys
+
+
+# Per-phase counters and timers for a Board.
+# Board only records into one when made with profile=True,
+# otherwise Board.profiler is None and nothing is recorded at all.
+#
+# Every entry is named "phase.what", for example "monkey.time" or "gauss.rows",
+# and keeps the number of records, their total and their largest value,
+# so a profiler stays the same size however long a run goes on.
+# Names ending in ".time" hold seconds measured with time.perf_counter().
+class Profiler:
+
+    def __init__(self):
+        self.entries = dict()   # name -> [count, total, largest]
+
+
+    # Adds one value to the named entry
+    def record(self, name, value=1):
+        entry = self.entries.get(name)
+        if entry is None:
+            self.entries[name] = [1, value, value]
+        else:
+            entry[0] += 1
+            entry[1] += value
+            if value > entry[2]:
+                entry[2] = value
+
+
+    # Returns the entries as a plain dict, {name: [count, total, largest]},
+    # which can be sent between processes or written as JSON.
+    def summary(self):
+        return {name: list(entry) for name, entry in self.entries.items()}
+
+
+    # Adds the entries of another profiler's summary() into this one,
+    # for totals over many boards.
+    def merge(self, summary):
+        for name, (count, total, largest) in summary.items():
+            entry = self.entries.get(name)
+            if entry is None:
+                self.entries[name] = [count, total, largest]
+            else:
+                entry[0] += count
+                entry[1] += total
+                if largest > entry[2]:
+                    entry[2] = largest
+
+
+    # Prints one line per entry. Times are printed in ms.
+    def report(self, file=sys.stdout):
+        print("NAME", "COUNT", "TOTAL", "MEAN", "MAX", sep='\t', file=file)
+        for name in sorted(self.entries):
+            count, total, largest = self.entries[name]
+            scale = 1
+            if name.endswith(".time"):
+                scale = 1000
+            print(name, count, round(scale * total, 3), round(scale * total / count, 3),
+                  round(scale * largest, 3), sep='\t', file=file)
@@ -0,0 +1,90 @@
+import sys
+import time
+import unicodedata
+
+
+# Draws the progress of a solve on a terminal, see Board.render().
+#
+# The board used to be printed a tile at a time, with the screen cleared and a
+# fixed sleep before every frame. A Renderer builds each frame in one string and
+# writes it in one go. After the first frame, only the tiles which changed since
+# the frame before are written, each after an escape moving the cursor to it.
+# Frames are drawn at most once every interval seconds: a frame which comes sooner
+# is skipped, so the solver never waits on the terminal, and the next frame due
+# shows everything that changed in between. A forced frame, like the finished board,
+# is always drawn. The time spent drawing is kept in time, so the solver can leave it
+# out of its own timings.
+#
+# A frame is a list of rows, each a list of the text of its tiles, as Board.frame() makes it.
+# Rows are drawn with a blank line between them, like Board.print() does.
+
+ESC = chr(27)
+CLEAR = ESC + "[2J" + ESC + "[H"    # clear the terminal, cursor to the top left
+
+
+# Columns text takes on a terminal, wide characters like the flag emoji taking 2
+def text_width(text):
+    return sum(2 if unicodedata.east_asian_width(ch) in ("W", "F") else 1 for ch in text)
+
+
+# Escape moving the cursor to row, col of the terminal, counted from 1
+def move_to(row, col):
+    return ESC + "[" + str(row) + ";" + str(col) + "H"
+
+
+class Renderer:
+
+    # out is the stream to draw on, stdout if not given.
+    # With diff off, every frame is written in full below the one before,
+    # like printing without clearing the terminal used to.
+    def __init__(self, out=None, interval=0.25, diff=True):
+        self.out = out
+        if out is None:
+            self.out = sys.stdout
+        self.interval = interval
+        self.diff = diff
+        self.shown = None       # Last frame drawn
+        self.last = None        # When the last frame was drawn, by time.perf_counter()
+        self.frames = 0         # Number of frames drawn
+        self.skipped = 0        # Number of frames skipped, as they came too soon
+        self.time = 0           # Seconds spent drawing, over every frame
+
+
+    # Is the interval since the last frame up, so a frame would be drawn now?
+    def due(self):
+        return (self.last is None) or (time.perf_counter() - self.last >= self.interval)
+
+
+    # Draws a frame, unless it comes before the interval is up and is not forced.
+    # Returns the time it took, 0 for a skipped frame.
+    def draw(self, frame, force=False):
+        if not (force or self.due()):
+            self.skipped += 1
+            return 0
+        start_time = time.perf_counter()
+        buffer = list()
+        if self.diff and self.shown is not None and len(self.shown) == len(frame):
+            for r, row in enumerate(frame):
+                shown_row = self.shown[r]
+                col = 1
+                for k, text in enumerate(row):
+                    if k >= len(shown_row) or text != shown_row[k]:
+                        buffer.append(move_to(2 * r + 1, col))
+                        buffer.append(text)
+                    col += text_width(text)
+            buffer.append(move_to(2 * len(frame) + 1, 1))     # leave the cursor below the board
+        else:
+            if self.diff:
+                buffer.append(CLEAR)
+            for row in frame:
+                buffer.append("".join(row))
+                buffer.append("\n\n")
+        self.out.write("".join(buffer))
+        self.out.flush()
+
+        self.shown = frame
+        self.frames += 1
+        self.last = time.perf_counter()
+        spent = self.last - start_time
+        self.time += spent
+        return spent
@@ -0,0 +1,127 @@
+from BatchBoard import BatchBoard
+from Board import Board
+from HugeBoard import HugeBoard
+from Patterns import PatternCache
+from Snapshot import Corpus
+from functools import partial
+from multiprocessing import Pool
+from random import randrange
+
+
+# PatternCache shared by every board played in this process, see use_patterns().
+patterns = None
+
+
+# Corpus files opened by this process, by path, see corpus_board().
+corpora = dict()
+
+
+# Makes the pattern cache of this process, holding up to max_size patterns,
+# starting from the patterns saved in path if it exists. A max_size of 0 turns it off.
+# Run in each worker process when trials are spread over a pool.
+def use_patterns(max_size, path=None):
+    global patterns
+    patterns = None
+    if max_size:
+        patterns = PatternCache(max_size, path)
+
+
+# Board k of the corpus file at path, opening the file the first time this process needs it.
+def corpus_board(path, k, profile=False, placement="sample"):
+    if path not in corpora:
+        corpora[path] = Corpus(path)
+    return corpora[path].board(k, profile, placement, patterns)
+
+
+# Plays one board from its seed.
+# The seed decides both the mines and the start tile,
+# so the same seed always plays the same game.
+# With profile, the board's Profiler summary is included as "profile".
+# placement is the Board's mine placement, "sample" or "rejection".
+# With huge, the board is a HugeBoard, which only stores the parts of the board it reaches.
+# With corpus, the path of a corpus file (see Snapshot.py), seed is instead the number
+#   of a board in that file, which is played as saved. Its own seed is reported.
+# options are passed on to Board.driver(), including its time_budget and step_budget.
+# Returns a dict describing how the game went, over_budget saying if the budget stopped it.
+def run_trial(rows, cols, mines, seed, keep_tracker=False, profile=False, placement="sample",
+              huge=False, corpus=None, **options):
+    if corpus is not None:
+        b = corpus_board(corpus, seed, profile, placement)
+    else:
+        board_class = Board
+        if huge:
+            board_class = HugeBoard
+        b = board_class(rows, cols, mines, seed, profile, placement, patterns)
+        b.start(b.rng.randint(0, rows-1), b.rng.randint(0, cols-1))
+    tracker = b.driver(**options)
+    result = {
+        "seed": b.seed,
+        "won": b.board_check(),
+        "exploration": tracker[-1][1],
+        "flags": b.flagged_count,
+        "mines": b.mined_count,
+        "time": tracker[-1][-1],
+        "over_budget": b.over_budget,
+    }
+    if keep_tracker:
+        result["tracker"] = tracker
+    if profile:
+        result["profile"] = b.profiler.summary()
+    return result
+
+
+# Plays the boards of seeds together on one BatchBoard, see BatchBoard.py.
+# Games and results are the same as run_trial() on each seed,
+# each board's time is its share of the batch's time.
+def run_batch(rows, cols, mines, seeds, guessing=True):
+    return BatchBoard(rows, cols, mines, seeds, patterns).driver(guessing=guessing)
+
+
+# Seeds of each trial in a run.
+# Trial i of a run started from seed s always gets seed s+i.
+def trial_seeds(seed, trials):
+    if seed is None:
+        seed = randrange(2**32)
+    return range(seed, seed + trials)
+
+
+# Plays trials boards, yielding each result as soon as its trial finishes.
+# With more than one worker, trials are spread over a pool of processes,
+# handed out chunksize at a time, and results arrive in the order they finish.
+# With pattern_size, every process keeps a pattern cache of that size for its boards,
+#   starting from pattern_file if given. On one worker, the cache is written back
+#   to pattern_file once every trial is played. Results are the same either way.
+# With batch, trials are played batch boards at a time by run_batch(), which needs numpy,
+#   and each worker is handed a whole batch. Only the guessing option applies,
+#   and the pattern cache is used the same way.
+# If seeds is given, those seeds are played instead of trials seeds from seed,
+#   for example to play again the boards which went over budget in an earlier run.
+# options are passed on to run_trial().
+def run_trials(rows, cols, mines, trials, seed=None, workers=1, chunksize=1,
+               pattern_size=0, pattern_file=None, batch=0, seeds=None, **options):
+    play = partial(run_trial, rows, cols, mines, **options)
+    if seeds is None:
+        seeds = trial_seeds(seed, trials)
+    if batch:
+        play_batch = partial(run_batch, rows, cols, mines, guessing=options.get("guessing", True))
+        batches = [seeds[i:i + batch] for i in range(0, len(seeds), batch)]
+    if workers <= 1:
+        use_patterns(pattern_size, pattern_file)
+        try:
+            if batch:
+                for b in batches:
+                    yield from play_batch(b)
+            else:
+                for s in seeds:
+                    yield play(s)
+        finally:    # also when the run is stopped early
+            if (patterns is not None) and (pattern_file is not None):
+                patterns.save()
+    else:
+        with Pool(workers, use_patterns, (pattern_size, pattern_file)) as pool:
+            if batch:
+                for results in pool.imap_unordered(play_batch, batches):
+                    yield from results
+            else:
+                for result in pool.imap_unordered(play, seeds, chunksize):
+                    yield result
@@ -0,0 +1,468 @@
+from Engines import make_engines
+from Positions import PositionBoard, position_rows
+from Profiler import Profiler
+from Runner import run_trial, use_patterns
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from os import cpu_count
+import argparse
+import asyncio
+import json
+import signal
+import sys
+import time
+
+
+# Local solve service: other tools send boards over a socket and get results back,
+# without building a Board themselves.
+#
+# Requests and replies are JSON objects, one per line. Every request has an "op",
+# and an optional "id" which is sent back with its reply:
+#   {"op": "solve", "rows": 16, "cols": 30, "mines": 99, "seed": 7, ...}
+#       plays a board from its seed like Runner.run_trial(). The options of SOLVE_OPTIONS
+#       (guessing, engines, time_budget, ...) are passed on to it, any other key is an error.
+#       Replies with its result.
+#   {"op": "move", "board": ["##1F-", ...], "mines": 99, "guessing": true}
+#       takes a position partway through a game, as Positions.py reads it: only what
+#       a player sees, never where the mines are. Replies with the next moves:
+#       "flag" and "open", the tiles the solver is certain of, and if it is certain
+#       of none and guessing is on, "guess", the tile least likely to be a mine,
+#       with its "probability". Nothing is opened, the client plays the moves.
+#   {"op": "stats"}
+#       replies with the queue depth, requests running and done, and their latency.
+# A reply is {"id": ..., "result": ...}, or {"id": ..., "error": "..."}.
+#
+# Solves run on a pool of worker processes, so the event loop never waits on one.
+# The workers are started once and kept, each with its own pattern cache, so they stay warm.
+# Requests wait in a queue of bounded size. Once it is full, a connection's next
+# request is not read until there is room, so clients which send too fast are slowed down
+# by the socket instead of the queue growing without end.
+# Replies on a connection are sent as their solves finish, which need not be
+# the order they were asked in, so clients should match them by id.
+# Each connection has its own queue of replies and a task which sends them (Connection),
+# so the dispatchers never wait on a client's socket and a client which reads slowly
+# only holds up its own replies. A connection can have at most MAX_PENDING requests
+# queued or running, its next request is not read until one of them is answered,
+# and it is closed once more than MAX_BACKLOG bytes of its replies wait to be sent.
+
+PORT = 8765
+
+# Requests which can wait in the queue, per worker
+QUEUE_PER_WORKER = 8
+
+# Requests of one connection which can be queued or running at once
+MAX_PENDING = 16
+
+# Bytes of replies which can wait to be sent on one connection before it is closed
+MAX_BACKLOG = 1 << 22
+
+# Moves engines look for before guessing, see move()
+MOVE_ENGINES = ["rules", "pairs", "gauss"]
+
+# Options of a "solve" request passed on to Runner.run_trial(). Others could draw on the
+# server's terminal, open its files, or build boards too big for its memory.
+SOLVE_OPTIONS = ["guessing", "pairs", "engines", "time_budget", "step_budget", "placement"]
+
+# Most tiles a board of a request can have
+MAX_TILES = 100000
+
+# Longest request line read, in bytes. A "move" takes at most 5 bytes a tile, on a board
+# one column wide (the tile, its quotes, a comma and a space), this leaves room to spare.
+# A longer line is skipped and answered with an error.
+LINE_LIMIT = 8 * MAX_TILES + (1 << 16)
+
+
+# Raises ValueError unless rows x cols is a board size a request may ask for
+def check_size(rows, cols):
+    if not (isinstance(rows, int) and isinstance(cols, int) and rows > 0 and cols > 0):
+        raise ValueError("rows and cols must be positive whole numbers")
+    if rows * cols > MAX_TILES:
+        raise ValueError("boards are limited to " + str(MAX_TILES) + " tiles")
+
+
+# Drops the rest of a line longer than a reader's limit, after readuntil() found
+# consumed bytes of it without an end. Raises IncompleteReadError if the stream ends first.
+async def skip_line(reader, consumed):
+    while True:
+        await reader.readexactly(consumed)
+        try:
+            await reader.readuntil(b"\n")
+            return
+        except asyncio.LimitOverrunError as e:
+            consumed = e.consumed
+
+
+# Plays a board for a "solve" request, in a worker process
+def solve(request):
+    options = dict(request)
+    for key in ("op", "id", "rows", "cols", "mines", "seed"):
+        options.pop(key, None)
+    unknown = sorted(key for key in options if key not in SOLVE_OPTIONS)
+    if unknown:
+        raise ValueError("unknown options: " + ", ".join(unknown) + ", choose from " + ", ".join(SOLVE_OPTIONS))
+    check_size(request["rows"], request["cols"])
+    return run_trial(request["rows"], request["cols"], request["mines"], request["seed"], **options)
+
+
+# Next moves for a "move" request, in a worker process.
+# The position is read into a PositionBoard, and the tiles the engines of MOVE_ENGINES
+# find on its frontier are the moves. If they find none and guessing is on,
+# the tile least likely to be a mine is worked out from what is shown (Board.best_guess()).
+def move(request):
+    rows = request["board"]
+    if isinstance(rows, list) and rows and isinstance(rows[0], str):
+        check_size(len(rows), len(rows[0]))
+    board = PositionBoard(rows, request["mines"])
+    error = board.inconsistency()
+    if error is not None:
+        raise ValueError(error)
+    forced = board.forced(make_engines(MOVE_ENGINES))
+    if forced is None:
+        raise ValueError("no mine placement fits the position")
+    mines, safe = forced
+    result = {
+        "flag": [board.coords(i) for i in mines],
+        "open": [board.coords(i) for i in safe],
+        "guess": None,
+        "probability": None,
+    }
+    if not (mines or safe) and request.get("guessing", True) and board.covered_count():
+        guessed = board.best_guess()
+        if guessed is not None:
+            result["guess"] = board.coords(guessed[0])
+            result["probability"] = float(guessed[1])
+    return result
+
+
+# Runs one request in a worker process
+def handle(request):
+    if request.get("op") == "solve":
+        return solve(request)
+    if request.get("op") == "move":
+        return move(request)
+    raise ValueError("unknown op " + repr(request.get("op")))
+
+
+# One client connection of a SolveService. Replies wait in a queue of its own
+# and a task of its own sends them, so queueing a reply never waits on the socket.
+class Connection:
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.slots = asyncio.Semaphore(MAX_PENDING)  # taken by each request queued or running
+        self.replies = asyncio.Queue()  # reply lines to send, None once there are no more
+        self.backlog = 0        # bytes of the replies in the queue
+        self.sender = asyncio.create_task(self.send())
+
+
+    # Queues a reply. If that leaves more than MAX_BACKLOG bytes of replies the client
+    # has not read, the connection is closed and its replies are dropped.
+    def reply(self, request_id, result=None, error=None):
+        if self.writer.is_closing():
+            return
+        message = {"id": request_id}
+        if error is not None:
+            message["error"] = error
+        else:
+            message["result"] = result
+        line = (json.dumps(message) + "\n").encode()
+        self.backlog += len(line)
+        if self.backlog > MAX_BACKLOG:
+            self.abort()
+        else:
+            self.replies.put_nowait(line)
+
+
+    # Sends the queued replies, each once the socket's send buffer has room.
+    async def send(self):
+        try:
+            while True:
+                line = await self.replies.get()
+                if line is None:
+                    break
+                self.backlog -= len(line)
+                self.writer.write(line)
+                await self.writer.drain()
+        except ConnectionError:     # the client went away, its replies are dropped
+            pass
+        self.writer.close()
+
+
+    # Closes the connection at once, dropping every reply not sent yet.
+    def abort(self):
+        self.writer.transport.abort()
+        self.sender.cancel()
+
+
+    # Sends the replies still to come, then closes the connection.
+    # Waits for every request of the connection to be answered first.
+    async def finish(self):
+        for _ in range(MAX_PENDING):
+            await self.slots.acquire()
+        self.replies.put_nowait(None)
+
+
+class SolveService:
+
+    def __init__(self, workers=None, queue_size=None, pattern_size=0):
+        if workers is None:
+            workers = cpu_count() or 1
+        if queue_size is None:
+            queue_size = QUEUE_PER_WORKER * workers
+        self.workers = workers
+        # Workers are started on first use, after the service is listening. Forked, they would
+        # hold its socket open after it closes, so they are spawned as fresh processes.
+        self.pool = ProcessPoolExecutor(workers, mp_context=get_context("spawn"),
+                                        initializer=use_patterns, initargs=(pattern_size,))
+        self.queue = asyncio.Queue(queue_size)  # [request, connection, time it arrived]
+        self.running = 0        # Requests being solved right now
+        self.done = 0           # Requests replied to
+        self.latency = Profiler()   # "solve.latency"/"move.latency": seconds from arriving to replied
+        self.tasks = list()
+        self.connections = dict()   # Connection -> task reading its requests
+        self.server = None
+
+
+    # Starts listening on host/port, or on the Unix socket at path if given.
+    async def start(self, host="127.0.0.1", port=PORT, path=None):
+        # one dispatcher per worker, so exactly as many requests run as there are workers
+        for _ in range(self.workers):
+            self.tasks.append(asyncio.create_task(self.dispatch()))
+        if path is not None:
+            self.server = await asyncio.start_unix_server(self.connection, path, limit=LINE_LIMIT)
+        else:
+            self.server = await asyncio.start_server(self.connection, host, port, limit=LINE_LIMIT)
+        return self.server
+
+
+    async def close(self):
+        self.server.close()
+        readers = list()
+        for connection, task in list(self.connections.items()):
+            connection.abort()
+            task.cancel()
+            readers.append(task)
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*readers, *self.tasks, return_exceptions=True)
+        await self.server.wait_closed()
+        self.pool.shutdown()
+
+
+    # Serves one connection: reads its requests, then once the client has sent
+    # all it will, sends the replies still to come and closes it.
+    async def connection(self, reader, writer):
+        connection = Connection(writer)
+        self.connections[connection] = asyncio.current_task()
+        try:
+            await self.read_requests(reader, connection)
+            await connection.finish()
+        except asyncio.CancelledError:  # the service is closing, see close()
+            pass
+        finally:
+            del self.connections[connection]
+
+
+    # Reads the requests of one connection. A request waits for one of the connection's
+    # slots and then for room in the queue before the next line is read, which is what
+    # slows down a client sending too fast.
+    async def read_requests(self, reader, connection):
+        try:
+            while True:
+                try:
+                    line = await reader.readuntil(b"\n")
+                except asyncio.IncompleteReadError as e:    # the last line has no newline
+                    line = e.partial
+                except asyncio.LimitOverrunError as e:
+                    await skip_line(reader, e.consumed)
+                    connection.reply(None, error="requests are limited to " + str(LINE_LIMIT) + " bytes")
+                    continue
+                if not line:
+                    break
+                arrived = time.perf_counter()
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    connection.reply(None, error="not a JSON request")
+                    continue
+                if not isinstance(request, dict):
+                    connection.reply(None, error="a request must be a JSON object")
+                elif request.get("op") == "stats":
+                    connection.reply(request.get("id"), self.stats())
+                else:
+                    await connection.slots.acquire()
+                    if connection.writer.is_closing():  # closed while waiting, see Connection.reply()
+                        connection.slots.release()
+                        break
+                    await self.queue.put([request, connection, arrived])
+        except (ConnectionError, asyncio.IncompleteReadError):  # gone, maybe partway through a long line
+            pass
+
+
+    # Takes requests from the queue and runs them on the pool, one at a time.
+    # Replies are only queued on their connection, never waited on.
+    async def dispatch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            request, connection, arrived = await self.queue.get()
+            self.running += 1
+            try:
+                result = await loop.run_in_executor(self.pool, handle, request)
+            except Exception as e:  # sent back to the client, the service keeps going
+                connection.reply(request.get("id"), error=type(e).__name__ + ": " + str(e))
+            else:
+                connection.reply(request.get("id"), result)
+            connection.slots.release()
+            self.running -= 1
+            self.done += 1
+            self.latency.record(str(request.get("op")) + ".latency", time.perf_counter() - arrived)
+            self.queue.task_done()
+
+
+    # Queue depth, requests running and done,
+    # and per op the count, mean and largest latency in seconds.
+    def stats(self):
+        latency = dict()
+        for name, (count, total, largest) in self.latency.summary().items():
+            latency[name] = {"count": count, "mean": total / count, "max": largest}
+        return {
+            "queued": self.queue.qsize(),
+            "queue_size": self.queue.maxsize,
+            "running": self.running,
+            "done": self.done,
+            "workers": self.workers,
+            "latency": latency,
+        }
+
+
+# Client for a SolveService, for tools and for trying the service out.
+# Requests can be sent from many tasks at once over the one connection,
+# each waits for the reply with its own id.
+class SolveClient:
+
+    def __init__(self):
+        self.reader = None
+        self.writer = None
+        self.waiting = dict()   # id -> future of its reply
+        self.next_id = 0
+        self.listener = None
+
+
+    async def connect(self, host="127.0.0.1", port=PORT, path=None):
+        # a reply can be as long as a connection's whole backlog, see Connection.reply()
+        if path is not None:
+            self.reader, self.writer = await asyncio.open_unix_connection(path, limit=MAX_BACKLOG)
+        else:
+            self.reader, self.writer = await asyncio.open_connection(host, port, limit=MAX_BACKLOG)
+        self.listener = asyncio.create_task(self.listen())
+
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+        self.listener.cancel()
+
+
+    # Hands each reply to the request waiting for it
+    async def listen(self):
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                break
+            message = json.loads(line)
+            future = self.waiting.pop(message.get("id"), None)
+            if future is not None:
+                future.set_result(message)
+        for future in self.waiting.values():
+            future.set_exception(ConnectionError("solve service closed the connection"))
+
+
+    # Sends a request and returns its result. Raises RuntimeError if the service replied with an error.
+    async def request(self, op, **fields):
+        self.next_id += 1
+        request_id = self.next_id
+        future = asyncio.get_running_loop().create_future()
+        self.waiting[request_id] = future
+        self.writer.write((json.dumps(dict(fields, op=op, id=request_id)) + "\n").encode())
+        await self.writer.drain()
+        message = await future
+        if "error" in message:
+            raise RuntimeError(message["error"])
+        return message["result"]
+
+
+    async def solve(self, rows, cols, mines, seed, **options):
+        return await self.request("solve", rows=rows, cols=cols, mines=mines, seed=seed, **options)
+
+
+    # Next moves for the position a player sees on a started board, see move().
+    # Only the position is sent, never where the board's mines are.
+    async def move(self, board, guessing=True):
+        return await self.request("move", board=position_rows(board), mines=board.num_mines,
+                                  guessing=guessing)
+
+
+    async def stats(self):
+        return await self.request("stats")
+
+
+async def serve(args):
+    service = SolveService(args.workers, args.queue_size, args.patterns)
+    await service.start(args.host, args.port, args.unix)
+    print("Solve service on", args.unix or (args.host + ":" + str(args.port)),
+          "with", service.workers, "workers", file=sys.stderr)
+    stopped = asyncio.Event()
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stopped.set)
+    except NotImplementedError:     # no signal handlers on Windows, only Ctrl-C stops it
+        pass
+    try:
+        await stopped.wait()    # until terminated or interrupted
+    finally:
+        await service.close()
+
+
+# Plays trials boards through the service, all sent at once, then prints the service's stats.
+async def try_client(args):
+    client = SolveClient()
+    await client.connect(args.host, args.port, args.unix)
+    try:
+        start_time = time.perf_counter()
+        results = await asyncio.gather(*[client.solve(args.rows, args.cols, args.mines, seed)
+                                         for seed in range(args.seed, args.seed + args.trials)])
+        elapsed = time.perf_counter() - start_time
+        wins = sum(1 for result in results if result["won"])
+        print("Played", len(results), "boards in", round(elapsed, 3), "s, won", wins)
+        print(json.dumps(await client.stats(), indent=1))
+    finally:
+        await client.close()
+
+
+# Usage: python Service.py serve [options], or python Service.py client [options], see --help.
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local minesweeper solve service.")
+    parser.add_argument("mode", choices=["serve", "client"])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--unix", default=None, help="Unix socket path to use instead of host/port")
+    parser.add_argument("--workers", type=int, default=None, help="serve: worker processes (default: one per CPU)")
+    parser.add_argument("--queue-size", type=int, default=None,
+                        help="serve: requests that can wait before clients are slowed down")
+    parser.add_argument("--patterns", type=int, default=0, help="serve: pattern cache size of each worker")
+    parser.add_argument("--rows", type=int, default=16, help="client: rows per board")
+    parser.add_argument("--cols", type=int, default=30, help="client: columns per board")
+    parser.add_argument("--mines", type=int, default=99, help="client: mines per board")
+    parser.add_argument("--trials", type=int, default=20, help="client: boards to play")
+    parser.add_argument("--seed", type=int, default=0, help="client: seed of the first board")
+    args = parser.parse_args(argv)
+    try:
+        if args.mode == "serve":
+            asyncio.run(serve(args))
+        else:
+            asyncio.run(try_client(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+from Board import Board, FLAGGED, MINED, OPENED
+import mmap
+import struct
+
+
+# Compact binary saves of boards, and corpus files of many boards.
+#
+# A snapshot holds a Board's size, mine count, seed and start tile, and its mines
+# as a bitmap of one bit per tile. With state, it also holds a bitmap of the opened
+# tiles and one of the flagged tiles, so a game can be saved partway through a solve
+# and restored later, in another process or on another machine.
+# A 16x30 board takes 90 bytes, or 210 with its state.
+#
+# Bitmaps keep tile i at bit i % 8 of byte i // 8.
+#
+# A corpus file holds many boards of the same size and mine count, each as a
+# fixed-size record of its seed, start tile and mine bitmap, after a short header.
+# Corpus maps the file into memory and only reads a record when its board is asked for,
+# so a corpus can be far bigger than memory and is never parsed as a whole.
+
+SNAPSHOT_MAGIC = b"MSNP"
+CORPUS_MAGIC = b"MSCP"
+VERSION = 2
+
+# magic, version, what is saved, rows, cols, num_mines, start tile, seed
+# Seeds are signed, as a negative seed plays as well as any other.
+SNAPSHOT_HEADER = struct.Struct("<4sBBIIIIq")
+# magic, version, rows, cols, num_mines, number of boards
+CORPUS_HEADER = struct.Struct("<4sBIIII")
+# seed, start tile, then the mine bitmap
+RECORD_HEADER = struct.Struct("<qI")
+
+# Bits of the second byte of a snapshot, saying what it holds
+HAS_SEED = 1
+HAS_STATE = 2
+
+# Tables for bytes.translate(): a state bit of each tile as the digits "0"/"1", and back
+DIGITS = {bit: bytes(ord("1") if b & bit else ord("0") for b in range(256)) for bit in (MINED, OPENED, FLAGGED)}
+UNDIGITS = bytes(1 if b == ord("1") else 0 for b in range(256))
+
+
+# Packs one state bit of every tile in state into a bitmap.
+# The bits are read as the digits of a big binary integer, tile 0 last,
+# so the packing is done by int() instead of a loop over the tiles.
+def pack_bits(state, bit):
+    size = len(state)
+    if size == 0:
+        return b""
+    return int(bytes(state).translate(DIGITS[bit])[::-1], 2).to_bytes((size + 7) // 8, "little")
+
+
+# Unpacks the first size bits of a bitmap, as one byte per tile, 1 where the bit is set.
+def unpack_bits(bitmap, size):
+    value = int.from_bytes(bitmap, "little")
+    return format(value, "0" + str(size) + "b")[::-1][:size].encode().translate(UNDIGITS)
+
+
+# Number of bytes in the bitmap of a rows x cols board
+def bitmap_size(rows, cols):
+    return (rows * cols + 7) // 8
+
+
+# Seeds which fit in a snapshot, other seeds (like None) are not saved
+def saved_seed(seed):
+    return isinstance(seed, int) and -2**63 <= seed < 2**63
+
+
+# Saves a started board as bytes.
+# With state, the opened and flagged tiles are saved too, see restore().
+def snapshot(board, state=True):
+    if board.start_index is None:
+        raise ValueError("only a started board can be saved")
+    what = 0
+    seed = 0
+    if saved_seed(board.seed):
+        what |= HAS_SEED
+        seed = board.seed
+    if state:
+        what |= HAS_STATE
+    data = bytearray(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, VERSION, what, board.rows, board.cols,
+                                          board.num_mines, board.start_index, seed))
+    data += pack_bits(board.state, MINED)
+    if state:
+        data += pack_bits(board.state, OPENED)
+        data += pack_bits(board.state, FLAGGED)
+    return bytes(data)
+
+
+# Makes the Board saved in data by snapshot().
+# Without saved state, the board is started like a new game, from its start tile.
+# With saved state, the tiles are flagged and opened one by one, without flood fills,
+# so the board ends up exactly as it was saved, counts and frontier index included.
+# Every unsolved tile is then on monkey()'s worklist and changed for gauss(),
+# so driver() picks up from there, and plays on to the same result.
+# profile, placement and patterns are passed on to Board().
+def restore(data, profile=False, placement="sample", patterns=None):
+    magic, version, what, rows, cols, num_mines, start, seed = SNAPSHOT_HEADER.unpack_from(data)
+    if magic != SNAPSHOT_MAGIC or version != VERSION:
+        raise ValueError("not a board snapshot")
+    size = rows * cols
+    nbytes = bitmap_size(rows, cols)
+    offset = SNAPSHOT_HEADER.size
+    if not what & HAS_SEED:
+        seed = None
+    board = Board(rows, cols, num_mines, seed, profile, placement, patterns)
+    mined = unpack_bits(data[offset:offset + nbytes], size)
+    if not what & HAS_STATE:
+        board.start(start // cols, start % cols, mined)
+        return board
+
+    board.start_index = start
+    board.place_given(mined)
+    opened = unpack_bits(data[offset + nbytes:offset + 2 * nbytes], size)
+    flagged = unpack_bits(data[offset + 2 * nbytes:offset + 3 * nbytes], size)
+    for i in range(size):
+        if flagged[i]:
+            board.flag_tile(i // cols, i % cols)
+    for i in range(size):
+        if opened[i]:
+            board.open_index(i)
+    return board
+
+
+# Writes a corpus file of the boards of seeds, each made like Runner.run_trial() makes it.
+# Only the mines are placed, the boards are not played.
+# seeds can be any iterable, the boards are written as they are made.
+# Raises ValueError for a seed which does not fit in a record (see saved_seed()).
+# Returns the number of boards written.
+def write_corpus(path, rows, cols, num_mines, seeds, placement="sample"):
+    count = 0
+    with open(path, "wb") as f:
+        f.write(CORPUS_HEADER.pack(CORPUS_MAGIC, VERSION, rows, cols, num_mines, 0))
+        for seed in seeds:
+            if not saved_seed(seed):
+                raise ValueError("seed " + repr(seed) + " does not fit in a corpus record")
+            board = Board(rows, cols, num_mines, seed, placement=placement)
+            row = board.rng.randint(0, rows - 1)
+            col = board.rng.randint(0, cols - 1)
+            board.place_mines(row, col)
+            f.write(RECORD_HEADER.pack(seed, board.index(row, col)))
+            f.write(pack_bits(board.state, MINED))
+            count += 1
+        f.seek(0)
+        f.write(CORPUS_HEADER.pack(CORPUS_MAGIC, VERSION, rows, cols, num_mines, count))
+    return count
+
+
+# Read-only view of a corpus file written by write_corpus(), mapped into memory.
+# corpus[k] is the k-th board, made and started, and iterating goes through them in order.
+class Corpus:
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.rows, self.cols, self.num_mines, self.count = CORPUS_HEADER.unpack_from(self.map)
+        if magic != CORPUS_MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(path + " is not a board corpus")
+        self.bitmap_size = bitmap_size(self.rows, self.cols)
+        self.record_size = RECORD_HEADER.size + self.bitmap_size
+
+
+    def __len__(self):
+        return self.count
+
+
+    # [seed, start tile, mine bitmap] of the k-th board, read straight from the mapped file
+    def record(self, k):
+        if not 0 <= k < self.count:
+            raise IndexError("corpus board out of range")
+        offset = CORPUS_HEADER.size + k * self.record_size
+        seed, start = RECORD_HEADER.unpack_from(self.map, offset)
+        offset += RECORD_HEADER.size
+        return [seed, start, self.map[offset:offset + self.bitmap_size]]
+
+
+    # Makes and starts the k-th board.
+    # profile, placement and patterns are passed on to Board().
+    def board(self, k, profile=False, placement="sample", patterns=None):
+        seed, start, bitmap = self.record(k)
+        board = Board(self.rows, self.cols, self.num_mines, seed, profile, placement, patterns)
+        board.start(start // self.cols, start % self.cols, unpack_bits(bitmap, self.rows * self.cols))
+        return board
+
+
+    def __getitem__(self, k):
+        return self.board(k)
+
+
+    def __iter__(self):
+        for k in range(self.count):
+            yield self.board(k)
+
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,151 @@
+from math import sqrt
+from statistics import NormalDist
+
+
+# Streaming statistics of a run of trials, in constant memory,
+# so a run can report how sure its numbers are as it goes, and stop once they are sure enough.
+
+# Confidence level of the intervals, unless another is given
+CONFIDENCE = 0.95
+
+
+# Number of standard errors either side of the mean for a two-sided interval
+# at the given confidence level, 1.96 for 0.95.
+def z_score(confidence=CONFIDENCE):
+    return NormalDist().inv_cdf(0.5 + confidence / 2)
+
+
+# Wilson score interval of a proportion, successes out of n, as [low, high].
+# Unlike mean +- z*std it stays inside [0, 1], and is not 0 wide
+# when every trial so far won or every trial so far lost.
+def wilson_interval(successes, n, z):
+    if n == 0:
+        return [0.0, 1.0]
+    p = successes / n
+    centre = (p + z * z / (2 * n)) / (1 + z * z / n)
+    spread = z * sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / (1 + z * z / n)
+    return [max(0.0, centre - spread), min(1.0, centre + spread)]
+
+
+# Count, mean and variance of a stream of values, one value at a time (Welford's method).
+# Adding to a running mean instead of summing and dividing at the end
+# stays accurate over millions of values.
+class RunningStats:
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0       # Sum of squared differences from the mean
+
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+
+    # Sample variance, 0 until there are 2 values
+    def variance(self):
+        if self.count < 2:
+            return 0.0
+        return self.m2 / (self.count - 1)
+
+
+    # Standard error of the mean
+    def error(self):
+        if self.count == 0:
+            return float("inf")
+        return sqrt(self.variance() / self.count)
+
+
+    # [low, high] confidence interval of the mean, mean +- z standard errors
+    def interval(self, z):
+        return [self.mean - z * self.error(), self.mean + z * self.error()]
+
+
+# Win rate, exploration and time of a run, added to as each result arrives.
+class TrialStats:
+
+    def __init__(self, confidence=CONFIDENCE):
+        self.z = z_score(confidence)
+        self.confidence = confidence
+        self.wins = 0
+        self.won = RunningStats()
+        self.exploration = RunningStats()
+        self.time = RunningStats()
+
+
+    # Adds a result of Runner.run_trial()
+    def add(self, result):
+        self.wins += bool(result["won"])
+        self.won.add(1 if result["won"] else 0)
+        self.exploration.add(result["exploration"])
+        self.time.add(result["time"])
+
+
+    # Wilson interval of the win rate, see wilson_interval()
+    def win_interval(self):
+        return wilson_interval(self.wins, self.won.count, self.z)
+
+
+    def win_width(self):
+        low, high = self.win_interval()
+        return high - low
+
+
+    # Prints each mean with its confidence interval
+    def report(self, file=None):
+        low, high = self.win_interval()
+        print("WIN RATE CI:     ", str(round(100 * low, 2)) + "% to " + str(round(100 * high, 2)) + "%",
+              "(" + str(round(100 * self.confidence, 1)) + "%, " + str(self.won.count) + " trials)", file=file)
+        for name, stats in (("EXPLORATION CI: ", self.exploration), ("TIME CI:        ", self.time)):
+            low, high = stats.interval(self.z)
+            print(name, round(low, 6), "to", round(high, 6), file=file)
+
+
+# Paired comparison of two solver configurations played on the same seeds.
+# Each pair adds the difference in wins (1, 0 or -1), and in exploration,
+# so the boards' own luck cancels out and far fewer trials tell them apart.
+class PairedStats:
+
+    def __init__(self, confidence=CONFIDENCE):
+        self.z = z_score(confidence)
+        self.confidence = confidence
+        self.won = RunningStats()           # first config's win minus second's
+        self.exploration = RunningStats()   # first config's exploration minus second's
+        self.first = TrialStats(confidence)
+        self.second = TrialStats(confidence)
+
+
+    def add(self, first, second):
+        self.first.add(first)
+        self.second.add(second)
+        self.won.add(bool(first["won"]) - bool(second["won"]))
+        self.exploration.add(first["exploration"] - second["exploration"])
+
+
+    # Is the difference in win rate, or else in exploration, outside its confidence interval
+    # around 0? Wins are checked first, as they are what a run is usually after.
+    # Never before min_trials pairs, as the intervals are not to be trusted on a handful.
+    # Checking after every pair finds a difference where there is none somewhat more often
+    # than 1 - confidence, so a run stopped this way is best confirmed with a fixed count.
+    def significant(self, min_trials=30):
+        if self.won.count < min_trials:
+            return False
+        for stats in (self.won, self.exploration):
+            low, high = stats.interval(self.z)
+            if low > 0 or high < 0:
+                return True
+        return False
+
+
+    # Prints each configuration's numbers and the differences between them
+    def report(self, file=None):
+        for name, stats in (("FIRST", self.first), ("SECOND", self.second)):
+            print(name, file=file)
+            stats.report(file=file)
+        for name, stats, scale in (("WIN RATE DIFF:  ", self.won, 100), ("EXPLORATION DIFF:", self.exploration, 1)):
+            low, high = stats.interval(self.z)
+            print(name, round(scale * stats.mean, 4), "(" + str(round(scale * low, 4)) + " to " +
+                  str(round(scale * high, 4)) + ")", file=file)
@@ -1,5 +1,15 @@
-from Board import Board
-from random import randint
+from Engines import ENGINES
+from Patterns import MAX_PATTERNS
+from Profiler import Profiler
+from Runner import run_trials, trial_seeds
+from Snapshot import Corpus, saved_seed, write_corpus
+from Stats import CONFIDENCE, PairedStats, TrialStats
+from itertools import takewhile
+from os import cpu_count
+import argparse
+import json
+import shlex
+import sys
 
 
 def get_settings():
@@ -8,21 +18,23 @@ def get_settings():
         difficulty = int(input(
             "\nSelect difficulty: \n 1: 9x9 with 10 mines \n 2: 16x16 with 40 mines \n 3: 16x30 with 99 mines \n 4: Custom size/trials \n "))
         if difficulty == 1:
-            return [9, 9, 10, 1, True, True, 0.25, True, False]
+            return [9, 9, 10, 1, True, True, 0.25, True, False, 1]
         elif difficulty == 2:
-            return [16, 16, 40, 1, True, True, 0.25, True, False]
+            return [16, 16, 40, 1, True, True, 0.25, True, False, 1]
         elif difficulty == 3:
-            return [16, 30, 99, 1, True, True, 0.25, True, False]
+            return [16, 30, 99, 1, True, True, 0.25, True, False, 1]
         elif difficulty == 4:
             rows = int(input("Rows:   "))
             cols = int(input("Cols:   "))
             mines = int(input("Mines:  "))
             trials = int(input("Trials: "))
             print_progress = False
+            workers = cpu_count()
             if trials == 1:
                 print_progress = True
+                workers = 1
             if (rows > 0) and (cols > 0) and (trials > 0):
-                return [rows, cols, mines, trials, print_progress, True, 0.25, True, False]
+                return [rows, cols, mines, trials, print_progress, True, 0.25, True, False, workers]
         elif difficulty == 0:
             print("EXTRA OPTIONS")
             print("Board options [enter integers]:")
@@ -36,47 +48,312 @@ def get_settings():
             print_delay = int(input("print_delay:    "))
             print_clear = int(input("print_clear:    "))
             print_tracker = int(input("print_tracker:  "))
-            return [rows, cols, mines, trials, print_progress, print_pretty, print_delay, print_clear, print_tracker]
+            print("Run options [enter integers]:")
+            workers = int(input("workers:        "))
+            return [rows, cols, mines, trials, print_progress, print_pretty, print_delay, print_clear, print_tracker, workers]
         else:
             print("Invalid input.")
 
 
-def main():
+# Reads settings from the command line, for scripted or scheduled runs.
+# main.py asks for its settings instead when it is given no arguments.
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Solve generated minesweeper boards.")
+    parser.add_argument("--rows", type=int, default=16, help="rows per board")
+    parser.add_argument("--cols", type=int, default=30, help="columns per board")
+    parser.add_argument("--mines", type=int, default=99, help="mines per board")
+    parser.add_argument("--trials", type=int, default=1, help="number of boards to play")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="seed of the first trial, trial i gets seed+i (random if not given)")
+    parser.add_argument("--workers", type=int, default=1, help="number of processes to play on")
+    parser.add_argument("--chunksize", type=int, default=1, help="trials handed to a worker at a time")
+    parser.add_argument("--output", default=None,
+                        help="file to write one JSON line per trial to, - for stdout")
+    parser.add_argument("--no-guessing", dest="guessing", action="store_false",
+                        help="stop when no tile is certain, instead of guessing")
+    parser.add_argument("--no-pairs", dest="pairs", action="store_false",
+                        help="go straight from monkey() to gauss(), without comparing pairs of tiles")
+    parser.add_argument("--engines", default=None,
+                        help="comma separated deduction engines to run after monkey() in that order, "
+                             "in place of pairs() and gauss(), from: " + ", ".join(ENGINES))
+    parser.add_argument("--patterns", type=int, default=MAX_PATTERNS,
+                        help="small frontier patterns each process remembers gauss() results for, 0 for none")
+    parser.add_argument("--pattern-file", default=None,
+                        help="JSON file to start the pattern cache from, written back after runs on one worker")
+    parser.add_argument("--placement", choices=["sample", "rejection"], default="sample",
+                        help="draw exactly the mines needed, or the original rejection placement")
+    parser.add_argument("--huge", action="store_true",
+                        help="only store the parts of each board the solver reaches, for boards of "
+                             "tens of millions of tiles (turns guessing off)")
+    parser.add_argument("--batch", type=int, default=0,
+                        help="play this many boards at a time in lockstep on numpy arrays, 0 for one at a time")
+    parser.add_argument("--corpus", default=None,
+                        help="play the boards saved in this corpus file, in place of rows/cols/mines/trials/seed")
+    parser.add_argument("--write-corpus", default=None,
+                        help="save the boards of the trials to this corpus file instead of playing them")
+    parser.add_argument("--time-budget", type=float, default=None,
+                        help="seconds each board may be solved for, it stops where it got to after that")
+    parser.add_argument("--step-budget", type=int, default=None,
+                        help="budget checks each board may take, like --time-budget but the same on every machine")
+    parser.add_argument("--over-budget", default=None,
+                        help="file to write the seeds of boards which went over budget to, one per line")
+    parser.add_argument("--seeds", default=None,
+                        help="file of seeds to play, one per line, like one written by --over-budget")
+    parser.add_argument("--ci-width", type=float, default=None,
+                        help="stop once the win rate's confidence interval is this narrow, "
+                             "as a fraction (0.02 for +-1%%), trials is then the most played")
+    parser.add_argument("--confidence", type=float, default=CONFIDENCE,
+                        help="confidence level of the intervals printed and stopped on")
+    parser.add_argument("--min-trials", type=int, default=30,
+                        help="trials played before stopping early")
+    parser.add_argument("--versus", nargs=argparse.REMAINDER, default=None,
+                        help="options of a second solver to compare with, every argument after it, "
+                             "like --versus --engines dpll --no-guessing (or one quoted string), "
+                             "both play the same seeds until they differ significantly or trials run out")
+    parser.add_argument("--profile", action="store_true",
+                        help="record per-phase counters and timers, and print their totals")
+    args = parser.parse_args(argv)
+    check_args(parser, args)
+    if args.versus is not None:
+        if not args.versus:
+            parser.error("--versus needs the options of the second solver after it")
+        options = args.versus
+        if len(options) == 1:   # given as one quoted string
+            options = shlex.split(options[0])
+        # the second solver is the command line before --versus with its options added on
+        before = list(takewhile(lambda a: a != "--versus" and not a.startswith("--versus="), argv))
+        versus = parser.parse_args(before + options)
+        versus.versus = None
+        check_args(parser, versus)
+        args.versus = versus
+    return args
 
-    rows, cols, mines, trials, print_progress, print_pretty, print_delay, print_clear, print_tracker = get_settings()
 
-    print_pretty = False  # this didnt end up looking right on most PCs
+# Checks parsed arguments, exiting with a usage error if they do not make sense.
+def check_args(parser, args):
+    if (args.rows <= 0) or (args.cols <= 0) or (args.trials <= 0) or (args.workers <= 0):
+        parser.error("rows, cols, trials and workers must be positive")
+    if not (0 <= args.mines <= args.rows * args.cols - 9):
+        parser.error("mines must leave room for the 3x3 start")
+    if args.engines is not None:
+        args.engines = args.engines.split(",")
+        unknown = [name for name in args.engines if name not in ENGINES]
+        if unknown:
+            parser.error("unknown engines: " + ", ".join(unknown))
+    if args.batch < 0:
+        parser.error("batch must not be negative")
+    if args.batch and (args.huge or args.profile or args.placement != "sample"):
+        parser.error("--batch plays sampled boards only, without --huge or --profile")
+    if args.batch and args.engines is not None:
+        parser.error("--batch runs its own rules, without --engines")
+    if args.batch and (args.time_budget is not None or args.step_budget is not None):
+        parser.error("--batch boards are not budgeted")
+    if args.seeds and (args.corpus or args.write_corpus):
+        parser.error("--seeds cannot be used with --corpus or --write-corpus")
+    if args.corpus and (args.batch or args.huge or args.write_corpus):
+        parser.error("--corpus cannot be used with --batch, --huge or --write-corpus")
+    if args.write_corpus and (args.seed is not None) and not (saved_seed(args.seed) and
+                                                           saved_seed(args.seed + args.trials - 1)):
+        parser.error("--write-corpus seeds must fit in a signed 64-bit integer")
+    if not (0 < args.confidence < 1):
+        parser.error("confidence must be between 0 and 1")
+    if (args.ci_width is not None) and not (0 < args.ci_width <= 1):
+        parser.error("ci-width must be between 0 and 1")
+    if args.versus and (args.output or args.profile or args.write_corpus or args.over_budget):
+        parser.error("--versus only prints the comparison, without --output, --profile, "
+                     "--write-corpus or --over-budget")
+
 
+# Plays the trials, adding each result in as soon as its trial finishes.
+# If out is given, each result is also written to it as one JSON line
+#   as soon as it arrives, so long runs can be followed while they go.
+# If profiler is given, every board is profiled and the profiles are merged into it.
+# If over_budget is given, the seed of each board which went over budget is added to it.
+# If stats is given, every result is added to it (see Stats.py), and with ci_width
+#   the run stops early once the win rate's interval is that narrow, after min_trials.
+# options are passed on to Runner.run_trials().
+# Returns [total wins, total time, total exploration].
+def play(rows, cols, mines, trials, out=None, print_tracker=False, profiler=None, over_budget=None,
+         stats=None, ci_width=None, min_trials=30, **options):
     total_wins = 0
     total_time = 0
     total_exp = 0
-    for _ in range(trials):
+    for result in run_trials(rows, cols, mines, trials, keep_tracker=bool(print_tracker),
+                             profile=(profiler is not None), **options):
 
-        b = Board(rows, cols, mines)
-        b.start(randint(0, rows-1), randint(0, cols-1))
-        tracker = b.driver(print_progress, print_pretty,
-                           print_delay, print_clear)
-
-        total_time += tracker[-1][-1]
-        total_exp += tracker[-1][1]
+        total_time += result["time"]
+        total_exp += result["exploration"]
         if print_tracker:
-            print(tracker)
+            print(result.pop("tracker"))
 
-        if b.board_check():
+        if result["won"]:
             total_wins += 1
 
-    print()
+        if profiler is not None:
+            profiler.merge(result["profile"])
+
+        if (over_budget is not None) and result["over_budget"]:
+            over_budget.append(result["seed"])
+
+        if out is not None:
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+
+        if stats is not None:
+            stats.add(result)
+            if (ci_width is not None) and stats.won.count >= min_trials and stats.win_width() <= ci_width:
+                break
+    return [total_wins, total_time, total_exp]
+
+
+def print_summary(trials, total_wins, total_time, total_exp, file=sys.stdout):
+    print(file=file)
     if trials == 1:
         if total_wins == 1:
-            print("WIN")
+            print("WIN", file=file)
         else:
-            print("Loss:\n Explored ", total_exp, '%', sep='')
+            print("Loss:\n Explored ", total_exp, '%', sep='', file=file)
+    else:
+        print("AVG TIME:       ", total_time / trials, file=file)
+        print("TOTAL TIME:     ", total_time, file=file)
+        print("WIN RATE:        ", 100*total_wins / trials, '%', sep='', file=file)
+        print("AVG EXPLORATION: ", total_exp / trials, '%', sep='', file=file)
+    print(file=file)
+
+
+# Runs from command line arguments if any are given,
+# otherwise asks for settings like it always has.
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv:
+        batch(parse_args(argv))
     else:
-        print("AVG TIME:       ", total_time / trials)
-        print("TOTAL TIME:     ", total_time)
-        print("WIN RATE:        ", 100*total_wins / trials, '%', sep='')
-        print("AVG EXPLORATION: ", total_exp / trials, '%', sep='')
+        interactive()
+
+
+def batch(args):
+    if args.write_corpus is not None:
+        seeds = trial_seeds(args.seed, args.trials)
+        count = write_corpus(args.write_corpus, args.rows, args.cols, args.mines, seeds, args.placement)
+        print("Saved", count, "boards, seeds", seeds[0], "to", seeds[-1], "to", args.write_corpus)
+        return
+    if args.versus is not None:
+        compare(args)
+        return
+    rows, cols, mines, trials, seed, seeds = boards(args)
+    over_budget = list()
+    stats = TrialStats(args.confidence)
+    out = None
+    summary_file = sys.stdout
+    if args.output == "-":
+        out = sys.stdout
+        summary_file = sys.stderr  # keep stdout to JSON lines only
+    elif args.output is not None:
+        out = open(args.output, "w")
+    profiler = None
+    if args.profile:
+        profiler = Profiler()
+    try:
+        totals = play(rows, cols, mines, trials, out=out, profiler=profiler, over_budget=over_budget,
+                      stats=stats, ci_width=args.ci_width, min_trials=args.min_trials,
+                      seed=seed, seeds=seeds, **trial_options(args))
+    finally:
+        if (out is not None) and (out is not sys.stdout):
+            out.close()
+    print_summary(stats.won.count, *totals, file=summary_file)
+    if stats.won.count > 1:
+        stats.report(file=summary_file)
+    if (args.time_budget is not None) or (args.step_budget is not None):
+        print("OVER BUDGET:     ", len(over_budget), file=summary_file)
+        if args.over_budget is not None:
+            with open(args.over_budget, "w") as f:
+                for s in sorted(over_budget):
+                    f.write(str(s) + "\n")
+    if profiler is not None:
+        profiler.report(file=summary_file)
+
+
+# Boards a run plays: [rows, cols, mines, trials, seed, seeds], see Runner.run_trials().
+def boards(args):
+    rows, cols, mines, trials, seed = args.rows, args.cols, args.mines, args.trials, args.seed
+    if args.corpus is not None:
+        with Corpus(args.corpus) as corpus:
+            rows, cols, mines, trials = corpus.rows, corpus.cols, corpus.num_mines, len(corpus)
+        seed = 0    # boards are numbered from 0 in the corpus
+    seeds = None
+    if args.seeds is not None:
+        with open(args.seeds) as f:
+            seeds = [int(line) for line in f if line.strip()]
+        trials = len(seeds)
+    return [rows, cols, mines, trials, seed, seeds]
+
+
+# Options of Runner.run_trials() set by the arguments, other than which boards to play
+def trial_options(args):
+    return dict(workers=args.workers, chunksize=args.chunksize,
+                guessing=args.guessing and not args.huge, pairs=args.pairs, placement=args.placement,
+                huge=args.huge, pattern_size=args.patterns, pattern_file=args.pattern_file,
+                batch=args.batch, corpus=args.corpus, engines=args.engines,
+                time_budget=args.time_budget, step_budget=args.step_budget)
+
+
+# Plays the boards of args with both its solver and the one of args.versus, on the same seeds,
+# until they differ significantly (see Stats.PairedStats), or trials pairs have been played.
+# Boards come from the first solver's arguments, only solver options of --versus are used.
+def compare(args):
+    rows, cols, mines, trials, seed, seeds = boards(args)
+    if seeds is None:
+        seeds = trial_seeds(seed, trials)   # so both solvers get the same seeds if seed is random
+    runs = [run_trials(rows, cols, mines, trials, seed=seed, seeds=seeds, **trial_options(a))
+            for a in (args, args.versus)]
+    stats = PairedStats(args.confidence)
+    waiting = [dict(), dict()]  # per solver, results whose pair has not arrived yet, by seed
+    stopped = False
+    for results in zip(*runs):
+        for k in (0, 1):
+            result = results[k]
+            other = waiting[1 - k].pop(result["seed"], None)
+            if other is None:
+                waiting[k][result["seed"]] = result
+            elif k == 0:
+                stats.add(result, other)
+            else:
+                stats.add(other, result)
+        if stats.significant(args.min_trials):
+            stopped = True
+            break
+    for run in runs:
+        run.close()
     print()
+    stats.report()
+    if stopped:
+        print("Significant difference after", stats.won.count, "pairs")
+    else:
+        print("No significant difference after", stats.won.count, "pairs")
+
+
+def interactive():
+
+    rows, cols, mines, trials, print_progress, print_pretty, print_delay, print_clear, print_tracker, workers = get_settings()
+
+    print_pretty = False  # this didnt end up looking right on most PCs
+
+    if print_progress:
+        workers = 1  # progress is printed by the board, so keep it in this process
+
+    profiler = None
+    if print_tracker:
+        profiler = Profiler()
+
+    # Trials are played by Runner, spread over workers processes.
+    totals = play(rows, cols, mines, trials, print_tracker=print_tracker, profiler=profiler,
+                  workers=workers, print_progress=print_progress, print_pretty=print_pretty,
+                  print_delay=print_delay, print_clear=print_clear)
+    print_summary(trials, *totals)
+    if profiler is not None:
+        profiler.report()
 
 
-main()
+if __name__ == "__main__":
+    main()